@@ -7,16 +7,20 @@ PDF页码校验工具 - Web应用
 版本: 1.0.1
 """
 
+import hmac
 import os
 import sys
 import tempfile
+import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime
 import logging
 from pytesseract import TesseractNotFoundError
 
 # 检查Flask是否已安装
 try:
-    from flask import Flask, render_template, request, jsonify, send_file
+    from flask import Flask, render_template, request, jsonify, send_file, url_for
     from werkzeug.utils import secure_filename
 except ImportError as e:
     print(f"❌ 缺少必要的依赖: {e}")
@@ -26,8 +30,16 @@ except ImportError as e:
 
 # 导入配置和核心逻辑
 try:
-    from config import AppConfig, FileConfig, LogConfig, OCRConfig, format_file_size
+    from config import AppConfig, FileConfig, LogConfig, OCRConfig, PoolConfig, PageCacheConfig, JobConfig, SchedulerConfig, ThumbnailConfig, ProfileConfig, format_file_size
     from pdf_page_validator import PDFPageValidator
+    from page_cache import PageResultCache
+    from page_scheduler import PageScheduler
+    from thumbnails import ThumbnailService
+    from result_encoding import (FORMATS, MIN_COMPRESS_SIZE, available_formats,
+                                 choose_encoding, choose_format, compress, encode_response)
+    from job_profiler import FORMATS as PROFILE_FORMATS, JobProfiler
+    from job_control import CancellationToken, JobCancelledError, socket_disconnect_probe
+    from validator_pool import ValidatorPool, PoolBusyError
 except ImportError as e:
     print(f"❌ 无法导入模块: {e}")
     print("请确保所有项目文件都存在且依赖已正确安装。")
@@ -54,31 +66,204 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# 全局验证器实例
-validator = None
+# 全局验证器池
+validator_pool = None
+_validator_pool_lock = threading.Lock()
 
-def get_validator():
+# 所有验证器共享的页面结果缓存，用于修订版PDF的增量验证
+page_result_cache = PageResultCache(max_entries=PageCacheConfig.MAX_ENTRIES)
+
+# 所有验证器共享的页面调度器，在并发任务之间公平分配页面工作线程
+page_scheduler = None
+if SchedulerConfig.WORKERS > 0:
+    page_scheduler = PageScheduler(
+        SchedulerConfig.WORKERS,
+        policy=SchedulerConfig.POLICY,
+        client_quota=SchedulerConfig.CLIENT_QUOTA
+    )
+
+def create_validator(ocr_semaphore=None):
     """
-    获取PDF验证器实例
+    创建PDF验证器实例，供验证器池调用
     
+    Args:
+        ocr_semaphore: 池内共享的OCR并发信号量
+        
     Returns:
         PDFPageValidator: 验证器实例
         
     Raises:
         Exception: 当验证器初始化失败时抛出
     """
-    global validator
-    if validator is None:
-        try:
-            validator = PDFPageValidator(tesseract_path=OCRConfig.TESSERACT_PATH)
-            logger.info("PDF验证器初始化成功")
-        except TesseractNotFoundError as e:
-            logger.error(f"Tesseract OCR 引擎未找到: {e}", exc_info=True)
-            raise Exception(f"验证器初始化失败: {str(e)}")
-        except Exception as e:
-            logger.error(f"初始化验证器失败: {e}")
-            raise Exception(f"验证器初始化失败: {str(e)}")
-    return validator
+    try:
+        instance = PDFPageValidator(
+            tesseract_path=OCRConfig.TESSERACT_PATH,
+            ocr_semaphore=ocr_semaphore,
+            page_cache=page_result_cache,
+            scheduler=page_scheduler,
+            batch_size=SchedulerConfig.BATCH_SIZE
+        )
+        logger.info("PDF验证器初始化成功")
+        return instance
+    except TesseractNotFoundError as e:
+        logger.error(f"Tesseract OCR 引擎未找到: {e}", exc_info=True)
+        raise Exception(f"验证器初始化失败: {str(e)}")
+    except Exception as e:
+        logger.error(f"初始化验证器失败: {e}")
+        raise Exception(f"验证器初始化失败: {str(e)}")
+
+def get_validator_pool():
+    """
+    获取PDF验证器池
+    
+    Returns:
+        ValidatorPool: 验证器池实例
+    """
+    global validator_pool
+    with _validator_pool_lock:
+        if validator_pool is None:
+            # 启用页面调度器时由调度器在任务之间公平分配工作线程，
+            # 不再按文档数限制准入，否则小文档会排在已准入的大文档之后
+            max_jobs = PoolConfig.MAX_CONCURRENT_JOBS
+            if page_scheduler is not None:
+                max_jobs = max(max_jobs, PoolConfig.MAX_SCHEDULED_JOBS)
+            validator_pool = ValidatorPool(
+                create_validator,
+                max_concurrent_jobs=max_jobs,
+                max_concurrent_ocr=PoolConfig.MAX_CONCURRENT_OCR,
+                max_queue_depth=PoolConfig.MAX_QUEUE_DEPTH,
+                max_wait_seconds=PoolConfig.MAX_QUEUE_WAIT_SECONDS,
+                max_concurrent_previews=PoolConfig.MAX_CONCURRENT_PREVIEWS
+            )
+    return validator_pool
+
+# 缩略图服务，按文档哈希缓存上传的文档和渲染结果
+thumbnail_service = ThumbnailService(
+    ThumbnailConfig.CACHE_DIR,
+    workers=ThumbnailConfig.WORKERS,
+    dpi=ThumbnailConfig.DPI,
+    max_documents=ThumbnailConfig.MAX_CACHED_DOCUMENTS
+)
+
+# 正在运行的验证任务，键为前端生成的任务ID，用于主动取消
+running_jobs = {}
+_running_jobs_lock = threading.Lock()
+
+# 验证任务性能剖析，未启用时为None
+job_profiler = None
+if ProfileConfig.ENABLED:
+    job_profiler = JobProfiler(
+        ProfileConfig.DIR,
+        mode=ProfileConfig.MODE,
+        interval_ms=ProfileConfig.SAMPLE_INTERVAL_MS,
+        sample_rate=ProfileConfig.SAMPLE_RATE,
+        max_per_hour=ProfileConfig.MAX_PER_HOUR,
+        max_stored=ProfileConfig.MAX_STORED,
+        threaded=page_scheduler is not None
+    )
+
+def profile_authorized():
+    """
+    判断请求是否携带有效的剖析令牌（X-Profile-Token 请求头）
+    
+    Returns:
+        bool: 未配置令牌时总是返回False
+    """
+    token = request.headers.get('X-Profile-Token', '')
+    return bool(ProfileConfig.TOKEN) and hmac.compare_digest(token.encode('utf-8'), ProfileConfig.TOKEN.encode('utf-8'))
+
+def profile_job(label, metadata):
+    """
+    按配置和请求标记决定是否剖析本次验证任务
+    
+    表单字段或查询参数 profile=1 且携带有效令牌时总是请求剖析（仍受频率限制），
+    其余任务按配置的比例抽样剖析。
+    
+    Args:
+        label: 任务说明
+        metadata: 随剖析结果保存的附加信息
+        
+    Returns:
+        上下文管理器，进入时给出剖析ID，不剖析时为None
+    """
+    if job_profiler is None:
+        return nullcontext(None)
+    requested = request.values.get('profile') == '1'
+    if requested and not profile_authorized():
+        logger.warning("收到未授权的剖析请求，已忽略")
+        requested = False
+    return job_profiler.profile(label, requested=requested, metadata=metadata)
+
+def get_time_budget():
+    """
+    计算本次请求的时间预算
+    
+    客户端可通过表单字段 time_budget 请求更短的预算，但不能超过配置的上限。
+    
+    Returns:
+        float or None: 时间预算（秒），None表示不限制
+    """
+    budget = JobConfig.TIME_BUDGET_SECONDS or None
+    try:
+        requested = float(request.form.get('time_budget', 0))
+    except (ValueError, TypeError):
+        requested = 0
+    if requested > 0:
+        budget = min(budget, requested) if budget else requested
+    return budget
+
+def result_response(payload):
+    """
+    按客户端的 Accept 和 Accept-Encoding 编码结果响应
+    
+    客户端可通过 ?format=json|columnar|msgpack 指定格式；否则按 Accept 中的 q 值选择，
+    q 值相同时依次优先 msgpack、columnar、json。响应只编码一次。
+    
+    Args:
+        payload: 响应数据
+        
+    Returns:
+        Response: 编码后的响应，Content-Type 表明实际采用的格式
+    """
+    start = time.perf_counter()
+    requested = request.args.get('format')
+    if requested in available_formats():
+        fmt = requested
+    else:
+        # 只认可明确列出的MIME类型，*/* 仍返回普通JSON
+        fmt = choose_format(list(request.accept_mimetypes)) or 'json'
+
+    encoding = choose_encoding([value for value, quality in request.accept_encodings if quality > 0])
+    body, applied = encode_response(payload, fmt, encoding)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    response = app.response_class(body, mimetype=FORMATS[fmt])
+    if applied:
+        response.headers['Content-Encoding'] = applied
+    response.vary.add('Accept')
+    response.vary.add('Accept-Encoding')
+    response.headers['Server-Timing'] = f'encode;dur={elapsed_ms:.1f}'
+    logger.info(f"结果已编码: 格式 {fmt}, 压缩 {applied or '无'}, {len(body)} 字节, 耗时 {elapsed_ms:.1f} ms")
+    return response
+
+def pool_busy_response(e):
+    """
+    将验证器池繁忙异常转换为带 Retry-After 头的响应
+    
+    Args:
+        e: PoolBusyError 异常
+        
+    Returns:
+        Response: 队列已满返回429，等待超时返回503
+    """
+    status = 429 if e.code == 'QUEUE_FULL' else 503
+    response = jsonify({
+        'error': '服务器繁忙，请稍后重试',
+        'code': e.code,
+        'retry_after': e.retry_after
+    })
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, status
 
 @app.route('/favicon.ico')
 def favicon():
@@ -130,15 +315,18 @@ def preview_file():
         file.save(temp_filepath)
         logger.info(f"为预览创建临时文件: {temp_filepath}")
         
-        validator_instance = get_validator()
-        # 使用用户指定的页码索引获取预览图
-        base64_image = validator_instance.get_page_preview(temp_filepath, page_num=page_index)
+        # 预览使用独立的并发上限，不必等待正在验证的文档
+        with get_validator_pool().acquire_preview() as validator_instance:
+            # 使用用户指定的页码索引获取预览图
+            base64_image = validator_instance.get_page_preview(temp_filepath, page_num=page_index)
         
         if base64_image:
             return jsonify({'preview_image': base64_image, 'page_index': page_index})
         else:
             return jsonify({'error': '生成预览失败，页码可能超出范围', 'code': 'PREVIEW_FAILED'}), 500
             
+    except PoolBusyError as e:
+        return pool_busy_response(e)
     except Exception as e:
         logger.error(f"生成预览时出错: {e}", exc_info=True)
         return jsonify({'error': '服务器内部错误', 'code': 'INTERNAL_ERROR'}), 500
@@ -151,6 +339,81 @@ def preview_file():
             except Exception as e:
                 logger.warning(f"清理预览临时文件失败: {e}")
 
+def get_sheet_range():
+    """
+    从请求参数中解析缩略图的页面范围
+    
+    Returns:
+        tuple: (起始页面索引, 页数)，页数不超过配置的上限
+    """
+    try:
+        start = max(0, int(request.values.get('start', 0)))
+    except (ValueError, TypeError):
+        start = 0
+    try:
+        count = int(request.values.get('count', ThumbnailConfig.MAX_PAGES_PER_SHEET))
+    except (ValueError, TypeError):
+        count = ThumbnailConfig.MAX_PAGES_PER_SHEET
+    return start, max(1, min(count, ThumbnailConfig.MAX_PAGES_PER_SHEET))
+
+@app.route('/thumbnails', methods=['POST'])
+def upload_thumbnails():
+    """
+    接收PDF文件，返回指定页面范围的缩略图拼图
+    
+    文档按内容哈希缓存，后续页面可通过 GET /thumbnails/<document_hash> 获取而无需重新上传。
+    
+    Returns:
+        dict: JSON响应，包含文档哈希、总页数、拼图及各缩略图的位置
+    """
+    if 'file' not in request.files:
+        return jsonify({'error': '没有选择文件', 'code': 'NO_FILE'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': '没有选择文件', 'code': 'NO_FILE'}), 400
+    
+    _, ext = os.path.splitext(file.filename)
+    if ext.lower() not in FileConfig.ALLOWED_EXTENSIONS:
+        return jsonify({
+            'error': f'只支持以下文件格式: {", ".join(FileConfig.ALLOWED_EXTENSIONS)}',
+            'code': 'INVALID_FORMAT'
+        }), 400
+    
+    try:
+        doc_hash = thumbnail_service.register(file.stream)
+    except ValueError as e:
+        logger.warning(f"缩略图上传的文件无效: {file.filename} ({e})")
+        return jsonify({'error': '无法打开PDF文件', 'code': 'INVALID_PDF'}), 400
+    
+    try:
+        start, count = get_sheet_range()
+        return result_response(thumbnail_service.get_sheet(doc_hash, start=start, count=count))
+    except Exception as e:
+        logger.error(f"生成缩略图时出错: {e}", exc_info=True)
+        return jsonify({'error': '生成缩略图失败', 'code': 'THUMBNAIL_FAILED'}), 500
+
+@app.route('/thumbnails/<doc_hash>')
+def get_thumbnails(doc_hash):
+    """
+    获取已缓存文档的缩略图拼图
+    
+    Args:
+        doc_hash: POST /thumbnails 返回的文档哈希
+        
+    Returns:
+        dict: JSON响应，格式同 POST /thumbnails
+    """
+    if not thumbnail_service.has_document(doc_hash):
+        return jsonify({'error': '文档不在缓存中，请重新上传', 'code': 'DOCUMENT_NOT_CACHED'}), 404
+    
+    try:
+        start, count = get_sheet_range()
+        return result_response(thumbnail_service.get_sheet(doc_hash, start=start, count=count))
+    except Exception as e:
+        logger.error(f"生成缩略图时出错: {e}", exc_info=True)
+        return jsonify({'error': '生成缩略图失败', 'code': 'THUMBNAIL_FAILED'}), 500
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """
@@ -189,7 +452,8 @@ def upload_file():
         logger.info(f"开始处理文件: {file.filename} (大小: {format_file_size(file_size)})")
         
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # 使用微秒级时间戳，避免并发上传同名文件时互相覆盖
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
         safe_filename = f"{timestamp}_{filename}"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], safe_filename)
         
@@ -210,14 +474,39 @@ def upload_file():
             except (ValueError, TypeError):
                 logger.warning("无法解析裁剪区域数据，将使用默认配置。")
 
-        validator_instance = get_validator()
-        result = validator_instance.validate_page_numbers(
-            filepath, 
-            dpi=OCRConfig.DEFAULT_DPI,
-            crop_data=crop_data  # 传递裁剪数据
-        )
+        # 客户端断开连接或主动取消时中止验证
+        job_id = request.form.get('job_id')
+        cancel_token = CancellationToken(socket_disconnect_probe(request.environ.get('werkzeug.socket')))
+        if job_id:
+            with _running_jobs_lock:
+                running_jobs[job_id] = cancel_token
+
+        profile_metadata = {'filename': file.filename, 'job_id': job_id}
+        try:
+            # 只剖析验证本身，不包括在池中排队的时间
+            with get_validator_pool().acquire() as validator_instance, \
+                    profile_job(file.filename, profile_metadata) as profile_id:
+                result = validator_instance.validate_page_numbers(
+                    filepath, 
+                    dpi=OCRConfig.DEFAULT_DPI,
+                    crop_data=crop_data,  # 传递裁剪数据
+                    time_budget=get_time_budget(),
+                    cancel_token=cancel_token,
+                    client_id=request.remote_addr
+                )
+                profile_metadata.update(total_pages=result['total_pages'], processed_pages=result['processed_pages'])
+        finally:
+            if job_id:
+                with _running_jobs_lock:
+                    running_jobs.pop(job_id, None)
         logger.info(f"验证完成: {file.filename}")
         
+    except PoolBusyError as e:
+        return pool_busy_response(e)
+    except JobCancelledError as e:
+        logger.info(f"验证任务已中止: {file.filename} ({e.reason})")
+        # 499: 客户端已关闭请求，响应通常不会被读取
+        return jsonify({'error': '验证任务已取消', 'code': 'CANCELLED', 'reason': e.reason}), 499
     except TesseractNotFoundError as e:
         logger.error(f"Tesseract OCR 引擎未找到: {e}", exc_info=True)
         return jsonify({
@@ -248,8 +537,33 @@ def upload_file():
     result['filename'] = file.filename
     result['upload_time'] = datetime.now().isoformat()
     result['file_size'] = format_file_size(file_size)
+    if profile_id:
+        result['profile'] = {
+            'id': profile_id,
+            'downloads': {fmt: url_for('download_profile', profile_id=profile_id, fmt=fmt)
+                          for fmt in job_profiler.formats}
+        }
     
-    return jsonify(result)
+    return result_response(result)
+
+@app.route('/cancel', methods=['POST'])
+def cancel_job():
+    """
+    取消正在运行的验证任务
+    
+    前端在页面关闭时通过 navigator.sendBeacon 调用，请求体为任务ID。
+    
+    Returns:
+        dict: JSON响应，说明是否找到并取消了任务
+    """
+    job_id = request.form.get('job_id') or request.get_data(as_text=True).strip()
+    with _running_jobs_lock:
+        cancel_token = running_jobs.get(job_id)
+    if cancel_token is None:
+        return jsonify({'cancelled': False, 'code': 'JOB_NOT_FOUND'}), 404
+    cancel_token.cancel('client_request')
+    logger.info(f"收到取消请求: {job_id}")
+    return jsonify({'cancelled': True})
 
 @app.route('/download-report', methods=['POST'])
 def download_report():
@@ -287,6 +601,93 @@ def get_config_endpoint():
         'version': '1.0.1'
     })
 
+@app.route('/pool-stats')
+def pool_stats():
+    """
+    获取验证器池的运行状态
+    
+    Returns:
+        dict: 活动任务数、排队长度、等待时间等统计信息
+    """
+    return jsonify(get_validator_pool().stats())
+
+@app.route('/scheduler-stats')
+def scheduler_stats():
+    """
+    获取页面调度器的运行状态
+    
+    Returns:
+        dict: 调度策略、各任务队列深度和最近的调度决策
+    """
+    if page_scheduler is None:
+        return jsonify({'enabled': False})
+    stats = page_scheduler.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/profiles')
+def list_profiles():
+    """
+    列出保存的任务剖析，需要剖析令牌
+    
+    Returns:
+        dict: 剖析管理器状态及各剖析的附加信息
+    """
+    if job_profiler is None:
+        return jsonify({'error': '未启用性能剖析', 'code': 'PROFILING_DISABLED'}), 404
+    if not profile_authorized():
+        return jsonify({'error': '缺少有效的剖析令牌', 'code': 'PROFILE_FORBIDDEN'}), 403
+    return jsonify({'stats': job_profiler.stats(), 'profiles': job_profiler.list_profiles()})
+
+@app.route('/profiles/<profile_id>/<fmt>')
+def download_profile(profile_id, fmt):
+    """
+    下载任务剖析结果，需要剖析令牌
+    
+    Args:
+        profile_id: 剖析ID
+        fmt: pstats（供 pstats / snakeviz 读取）或 collapsed（折叠调用栈，用于生成火焰图）
+        
+    Returns:
+        Response: 剖析结果文件
+    """
+    if job_profiler is None:
+        return jsonify({'error': '未启用性能剖析', 'code': 'PROFILING_DISABLED'}), 404
+    if not profile_authorized():
+        return jsonify({'error': '缺少有效的剖析令牌', 'code': 'PROFILE_FORBIDDEN'}), 403
+    try:
+        path = job_profiler.get_profile_path(profile_id, fmt)
+    except (ValueError, FileNotFoundError) as e:
+        return jsonify({'error': str(e), 'code': 'PROFILE_NOT_FOUND'}), 404
+    suffix, mimetype = PROFILE_FORMATS[fmt]
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=f"profile_{profile_id}{suffix}", mimetype=mimetype)
+
+@app.after_request
+def compress_response(response):
+    """
+    按 Accept-Encoding 压缩其余较大的文本响应（例如预览图）
+    
+    Args:
+        response: 原始响应
+        
+    Returns:
+        Response: 压缩后的响应；已压缩、流式或较小的响应原样返回
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in ('application/json', 'text/html', 'text/plain')):
+        return response
+    
+    encoding = choose_encoding([value for value, quality in request.accept_encodings if quality > 0])
+    body = response.get_data()
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return response
+    
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.errorhandler(413)
 def too_large(e):
     max_size_formatted = format_file_size(app.config["MAX_CONTENT_LENGTH"])
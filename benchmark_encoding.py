@@ -0,0 +1,115 @@
+"""
+PDF页码校验工具 - 结果编码基准测试
+
+比较验证结果在不同编码格式和压缩算法下的响应大小与序列化耗时。
+基准为原先 Flask jsonify 的输出（调试模式下缩进，中文转义）。
+
+用法:
+    python benchmark_encoding.py --pages 1000
+"""
+
+import argparse
+import base64
+import json
+import random
+import time
+
+from result_encoding import available_encodings, available_formats, compress, encode
+
+
+def build_result(pages: int, image_bytes: int, seed: int = 0) -> dict:
+    """
+    构造一个模拟的验证结果
+
+    Args:
+        pages: 页数
+        image_bytes: 每页裁剪图片的PNG大小（字节），以随机数据模拟已压缩的PNG
+        seed: 随机种子
+
+    Returns:
+        dict: 与 validate_page_numbers 返回结构一致的结果
+    """
+    rng = random.Random(seed)
+    validation_results = []
+    for i in range(pages):
+        # 大约5%的页面识别错误
+        detected = i + 1 if rng.random() > 0.05 else rng.choice([None, i + 2])
+        png = bytes(rng.getrandbits(8) for _ in range(image_bytes))
+        validation_results.append({
+            'page_index': i,
+            'actual_number': i + 1,
+            'detected_number': detected,
+            'is_valid': detected == i + 1,
+            'cropped_image_b64': f"data:image/png;base64,{base64.b64encode(png).decode('utf-8')}",
+            'render_dpi': 100.0,
+            'render_bytes': 165 * 88 * 3,
+        })
+
+    issues = [f"第 {r['page_index'] + 1} 页: 期望页码 {r['actual_number']}, 检测到页码 {r['detected_number']}"
+              for r in validation_results if not r['is_valid']]
+    correct = pages - len(issues)
+    return {
+        'total_pages': pages,
+        'processed_pages': pages,
+        'incomplete': False,
+        'stop_reason': None,
+        'correct_pages': correct,
+        'error_pages': len(issues),
+        'validation_results': validation_results,
+        'issues': issues,
+        'success_rate': correct / pages * 100 if pages else 0,
+        'reused_pages': 0,
+        'filename': '示例文档.pdf',
+        'file_size': '12.3 MB',
+    }
+
+
+def measure(func, repeat: int):
+    """
+    多次执行并返回最后一次的结果和平均耗时（毫秒）
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        output = func()
+    return output, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    """
+    主函数 - 命令行接口
+    """
+    parser = argparse.ArgumentParser(description='验证结果编码基准测试')
+    parser.add_argument('--pages', type=int, default=1000, help='模拟结果的页数')
+    parser.add_argument('--image-bytes', type=int, default=2000, help='每页裁剪图片的PNG大小（字节）')
+    parser.add_argument('--repeat', type=int, default=5, help='每种组合的重复次数')
+    args = parser.parse_args()
+
+    result = build_result(args.pages, args.image_bytes)
+    rows = []
+
+    # 基准：原先 jsonify 的输出
+    baselines = {
+        'jsonify (调试模式)': lambda: json.dumps(result, ensure_ascii=True, sort_keys=True, indent=2).encode('utf-8'),
+        'jsonify': lambda: json.dumps(result, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('utf-8'),
+    }
+    for name, func in baselines.items():
+        body, elapsed = measure(func, args.repeat)
+        rows.append((name, '无', len(body), elapsed))
+
+    for fmt in available_formats():
+        body, encode_ms = measure(lambda: encode(result, fmt), args.repeat)
+        rows.append((fmt, '无', len(body), encode_ms))
+        for encoding in available_encodings():
+            compressed, compress_ms = measure(lambda: compress(body, encoding), args.repeat)
+            rows.append((fmt, encoding, len(compressed), encode_ms + compress_ms))
+
+    baseline_size = rows[0][2]
+    print(f"模拟结果: {args.pages} 页，每页图片 {args.image_bytes} 字节")
+    print(f"{'格式':<22}{'压缩':<6}{'字节数':>12}{'相对基准':>10}{'耗时(ms)':>12}")
+    print("-" * 62)
+    for name, encoding, size, elapsed in rows:
+        print(f"{name:<22}{encoding:<6}{size:>12,}{size / baseline_size:>10.1%}{elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -78,6 +78,14 @@ class OCRConfig:
     # OCR语言
     OCR_LANGUAGE = os.environ.get('PDF_OCR_LANGUAGE', 'eng')
 
+    # OCR后端，按优先级排列，以逗号分隔；最后一个后端的结果总是被采用
+    # template: 进程内数字模板识别，从同一文档中Tesseract确认的页码学习字形
+    # tesseract: Tesseract子进程
+    OCR_BACKENDS = [name.strip() for name in os.environ.get('PDF_OCR_BACKENDS', 'template,tesseract').split(',') if name.strip()]
+
+    # 采用模板识别结果所需的最低置信度（字形与模板的相关系数）
+    TEMPLATE_MIN_CONFIDENCE = float(os.environ.get('PDF_TEMPLATE_MIN_CONFIDENCE', 0.85))
+
     # --- 废弃：旧的粗略区域识别配置 ---
     # 为提高准确性，以下配置已由更精确的设置取代。
     # 建议迁移到下方的"精准区域识别配置"。
@@ -108,6 +116,115 @@ class OCRConfig:
     # 调试图片保存路径
     DEBUG_IMAGE_PATH = 'debug_crops'
 
+# 并发控制配置
+class PoolConfig:
+    """验证器池与并发控制相关配置"""
+
+    # 同时处理的文档数上限（每个文档会占用一个验证器实例和整页渲染的内存）
+    MAX_CONCURRENT_JOBS = int(os.environ.get('PDF_MAX_CONCURRENT_JOBS', 2))
+
+    # 启用页面调度器时的同时处理文档数上限，取代 MAX_CONCURRENT_JOBS
+    # 此时CPU由页面工作线程数限制，渲染内存由像素预算和内存上限限制，文档数上限只用于防止无限堆积；
+    # 取值远大于工作线程数，小文档无需排在大文档之后等待名额
+    MAX_SCHEDULED_JOBS = int(os.environ.get('PDF_MAX_SCHEDULED_JOBS', 32))
+
+    # 同时生成的单页预览数上限，预览不占用文档名额
+    MAX_CONCURRENT_PREVIEWS = int(os.environ.get('PDF_MAX_CONCURRENT_PREVIEWS', 4))
+
+    # 同时运行的Tesseract子进程数上限，所有文档共享
+    MAX_CONCURRENT_OCR = int(os.environ.get('PDF_MAX_CONCURRENT_OCR', os.cpu_count() or 2))
+
+    # 等待队列的最大长度，超出后立即拒绝请求 (HTTP 429)
+    MAX_QUEUE_DEPTH = int(os.environ.get('PDF_MAX_QUEUE_DEPTH', 8))
+
+    # 请求在队列中的最长等待时间（秒），超时后拒绝请求 (HTTP 503)
+    MAX_QUEUE_WAIT_SECONDS = float(os.environ.get('PDF_MAX_QUEUE_WAIT', 30))
+
+# 渲染内存配置
+class RenderConfig:
+    """页面渲染内存相关配置"""
+
+    # 单页渲染的像素预算，超出时自动降低该页的渲染分辨率；设为0表示不限制
+    # 25,000,000 像素的RGB图像约占 75MB 内存
+    MAX_PIXELS_PER_PAGE = int(os.environ.get('PDF_MAX_PIXELS_PER_PAGE', 25_000_000))
+
+    # 单个任务同时渲染的页面内存上限 (MB)，并行渲染超出上限时等待；设为0表示不限制
+    MAX_JOB_MEMORY_MB = int(os.environ.get('PDF_MAX_JOB_MEMORY_MB', 512))
+
+# 页面调度配置
+class SchedulerConfig:
+    """页面批次调度相关配置"""
+
+    # 共享的页面工作线程数，设为0表示不使用调度器，在请求线程中逐页处理
+    WORKERS = int(os.environ.get('PDF_PAGE_WORKERS', os.cpu_count() or 2))
+
+    # 调度策略: round_robin（轮转）、shortest_remaining（剩余最少优先）、fifo（先到先得）
+    POLICY = os.environ.get('PDF_SCHEDULER_POLICY', 'round_robin')
+
+    # 每个工作单元包含的页数，越小调度越公平，越大开销越低
+    BATCH_SIZE = int(os.environ.get('PDF_PAGE_BATCH_SIZE', 4))
+
+    # 每个客户端同时执行的批次数上限，设为0表示不限制
+    CLIENT_QUOTA = int(os.environ.get('PDF_CLIENT_QUOTA', 0))
+
+# 任务控制配置
+class JobConfig:
+    """验证任务时间预算相关配置"""
+
+    # 单个验证任务的时间预算（秒），用完后返回部分结果；设为0表示不限制
+    # 建议设置为略小于反向代理的超时时间
+    TIME_BUDGET_SECONDS = float(os.environ.get('PDF_TIME_BUDGET', 0))
+
+# 页面结果缓存配置
+class PageCacheConfig:
+    """页面识别结果缓存相关配置"""
+
+    # 最多缓存的页面结果数（每条约含一张裁剪小图），设为0表示禁用缓存
+    MAX_ENTRIES = int(os.environ.get('PDF_PAGE_CACHE_SIZE', 5000))
+
+# 缩略图配置
+class ThumbnailConfig:
+    """文档缩略图相关配置"""
+
+    # 缩略图分辨率，只用于浏览页面布局，无需太高
+    DPI = int(os.environ.get('PDF_THUMBNAIL_DPI', 20))
+
+    # 并行渲染缩略图的工作进程数，设为0表示在请求线程中渲染
+    WORKERS = int(os.environ.get('PDF_THUMBNAIL_WORKERS', min(4, os.cpu_count() or 1)))
+
+    # 单次请求返回的最大缩略图数
+    MAX_PAGES_PER_SHEET = int(os.environ.get('PDF_THUMBNAIL_PAGES_PER_SHEET', 50))
+
+    # 缓存目录及最多缓存的文档数
+    CACHE_DIR = os.environ.get('PDF_THUMBNAIL_CACHE_DIR', 'thumbnail_cache')
+    MAX_CACHED_DOCUMENTS = int(os.environ.get('PDF_THUMBNAIL_CACHE_DOCUMENTS', 20))
+
+# 性能剖析配置
+class ProfileConfig:
+    """验证任务性能剖析相关配置"""
+
+    # 是否启用性能剖析，未启用时忽略所有剖析请求
+    ENABLED = os.environ.get('PDF_PROFILE_ENABLED', 'False').lower() == 'true'
+
+    # 请求剖析和下载剖析结果所需的令牌（X-Profile-Token 请求头），为空时只能在服务器上查看剖析文件
+    TOKEN = os.environ.get('PDF_PROFILE_TOKEN', '')
+
+    # 剖析方式: sampling（定时采样所有页面工作线程）或 cprofile（确定性剖析请求线程）
+    MODE = os.environ.get('PDF_PROFILE_MODE', 'sampling')
+
+    # 采样间隔（毫秒）
+    SAMPLE_INTERVAL_MS = float(os.environ.get('PDF_PROFILE_INTERVAL_MS', 10))
+
+    # 未携带剖析标记的任务被自动剖析的比例，0 表示只剖析明确请求的任务
+    SAMPLE_RATE = float(os.environ.get('PDF_PROFILE_SAMPLE_RATE', 0))
+
+    # 每小时最多剖析的任务数，同一时间只剖析一个任务
+    MAX_PER_HOUR = int(os.environ.get('PDF_PROFILE_MAX_PER_HOUR', 12))
+
+    # 剖析结果目录及最多保留的剖析数
+    DIR = os.environ.get('PDF_PROFILE_DIR', 'profiles')
+    MAX_STORED = int(os.environ.get('PDF_PROFILE_MAX_STORED', 50))
+
 # 日志配置
 class LogConfig:
     """日志相关配置"""
@@ -163,4 +280,11 @@ def print_config():
     print(f"   主机: {AppConfig.HOST}")
     print(f"   端口: {AppConfig.PORT}")
     print(f"   OCR DPI: {OCRConfig.DEFAULT_DPI}")
-    print(f"   OCR 语言: {OCRConfig.OCR_LANGUAGE}") 
\ No newline at end of file
+    print(f"   OCR 语言: {OCRConfig.OCR_LANGUAGE}")
+    print(f"   并发文档数: {PoolConfig.MAX_SCHEDULED_JOBS if SchedulerConfig.WORKERS > 0 else PoolConfig.MAX_CONCURRENT_JOBS}")
+    print(f"   并发OCR数: {PoolConfig.MAX_CONCURRENT_OCR}")
+    print(f"   等待队列长度: {PoolConfig.MAX_QUEUE_DEPTH}")
+    print(f"   页面工作线程: {SchedulerConfig.WORKERS} ({SchedulerConfig.POLICY})")
+    print(f"   单页像素预算: {RenderConfig.MAX_PIXELS_PER_PAGE}")
+    print(f"   单任务渲染内存上限: {RenderConfig.MAX_JOB_MEMORY_MB} MB")
+    print(f"   性能剖析: {'启用 (' + ProfileConfig.MODE + ')' if ProfileConfig.ENABLED else '未启用'}") 
\ No newline at end of file
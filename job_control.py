@@ -0,0 +1,109 @@
+"""
+PDF页码校验工具 - 任务控制
+
+提供验证任务的取消令牌。验证过程在页与页之间检查令牌，
+一旦任务被取消（例如客户端断开连接）即中止，释放验证器和临时文件。
+"""
+
+import select
+import socket
+import threading
+from typing import Callable, Optional
+
+
+class JobCancelledError(Exception):
+    """
+    验证任务被取消时抛出的异常
+
+    Attributes:
+        reason: 取消原因，例如 'client_disconnected' 或 'client_request'
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(f"验证任务已取消: {reason}")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    线程安全的取消令牌
+
+    可由其他线程调用 cancel() 主动取消，也可以提供一个探测函数，
+    在每次检查时判断客户端是否已经断开。
+    """
+
+    def __init__(self, disconnect_probe: Optional[Callable[[], bool]] = None):
+        """
+        初始化取消令牌
+
+        Args:
+            disconnect_probe: 返回True表示客户端已断开的探测函数，为None时不探测
+        """
+        self._event = threading.Event()
+        self._probe = disconnect_probe
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = 'client_request'):
+        """
+        取消任务
+
+        Args:
+            reason: 取消原因
+        """
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def is_cancelled(self) -> bool:
+        """
+        检查任务是否已取消
+
+        Returns:
+            bool: 已取消返回True
+        """
+        if not self._event.is_set() and self._probe is not None:
+            try:
+                if self._probe():
+                    self.cancel('client_disconnected')
+            except Exception:
+                # 探测失败不应影响验证本身
+                self._probe = None
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """
+        如果任务已取消则抛出异常
+
+        Raises:
+            JobCancelledError: 任务已取消
+        """
+        if self.is_cancelled():
+            raise JobCancelledError(self.reason)
+
+
+def socket_disconnect_probe(sock: Optional[socket.socket]) -> Optional[Callable[[], bool]]:
+    """
+    为客户端连接创建断开探测函数
+
+    请求体读取完毕后，客户端不会再发送数据；此时套接字变为可读且读到EOF即表示对端已关闭连接。
+
+    Args:
+        sock: 客户端连接的套接字，服务器未提供时为None
+
+    Returns:
+        Optional[Callable[[], bool]]: 探测函数，无法探测时返回None
+    """
+    if sock is None:
+        return None
+
+    def probe() -> bool:
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            if not readable:
+                return False
+            return sock.recv(1, socket.MSG_PEEK) == b''
+        except (ConnectionError, ValueError):
+            # 连接被重置或套接字已关闭
+            return True
+
+    return probe
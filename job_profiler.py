@@ -0,0 +1,374 @@
+"""
+PDF页码校验工具 - 任务性能剖析
+
+对单个验证任务进行性能剖析，定位耗时异常的文档把时间花在了哪里：
+1. sampling: 定时采样任务线程及页面工作线程的调用栈（墙钟时间），开销低，可导出 pstats 和折叠调用栈
+2. cprofile: 使用 cProfile 确定性剖析任务线程，只能导出 pstats；
+   页面由页面工作线程处理时任务线程只在等待，此时自动改用 sampling
+
+剖析结果保存在剖析目录中，折叠调用栈可直接交给 flamegraph.pl 或 speedscope 生成火焰图。
+同一时间只剖析一个任务，并限制每小时剖析的任务数，可以在生产环境中长期开启。
+"""
+
+import cProfile
+import json
+import logging
+import marshal
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+from page_scheduler import job_tag, thread_job_tags
+
+
+MODES = ('sampling', 'cprofile')
+
+# 导出格式: 文件后缀及MIME类型
+FORMATS = {
+    'pstats': ('.pstats', 'application/octet-stream'),
+    'collapsed': ('.collapsed.txt', 'text/plain'),
+}
+
+_PROFILE_ID_PATTERN = re.compile(r'^\d{8}_\d{6}_\d{6}_[0-9a-f]{4}$')
+
+# pstats 使用的函数标识: (文件名, 首行行号, 函数名)
+FuncKey = Tuple[str, int, str]
+
+
+class StackSampler:
+    """
+    定时采样指定线程调用栈的采样剖析器
+
+    采样的是墙钟时间：等待Tesseract子进程或调度队列的时间同样计入，便于发现排队和I/O瓶颈。
+    页面工作线程由所有任务共享，指定任务标签时只采样正在执行该任务批次的工作线程。
+    每个样本按实际到下一次采样的时间计时，采样线程被延迟时不会低估耗时。
+    """
+
+    def __init__(self, interval: float, thread_ids: Optional[set] = None, thread_prefixes: Tuple[str, ...] = (),
+                 tag: Optional[Hashable] = None):
+        """
+        Args:
+            interval: 采样间隔（秒）
+            thread_ids: 需要采样的线程ID
+            thread_prefixes: 需要采样的线程名前缀，例如页面工作线程
+            tag: 只采样带有该任务标签（见 page_scheduler.job_tag）的前缀线程，为None时不过滤
+        """
+        self.interval = interval
+        self.thread_ids = set(thread_ids or ())
+        self.thread_prefixes = tuple(thread_prefixes)
+        self.tag = tag
+        self.samples: Counter = Counter()
+        self.elapsed: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动采样线程"""
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止采样并等待采样线程退出"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        # 启动后立即采样一次，保证很快结束的任务也至少有一个样本
+        while True:
+            taken_at = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            tags = thread_job_tags() if self.tag is not None else {}
+            keys = []
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if ident not in self.thread_ids:
+                    if not name.startswith(self.thread_prefixes):
+                        continue
+                    # 跳过正在执行其他任务批次的工作线程
+                    if self.tag is not None and tags.get(ident) != self.tag:
+                        continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                # 跳过在主循环中等待新工作单元的空闲工作线程
+                if ident not in self.thread_ids and len(stack) > 1 and stack[0][2] == 'wait' and stack[1][2] == '_worker':
+                    continue
+                if stack:
+                    # 页面工作线程按线程名合并，便于在火焰图中对比
+                    label = re.sub(r'-\d+$', '', name)
+                    keys.append((label, tuple(reversed(stack))))
+            self.samples.update(keys)
+            self.sample_count += 1
+            stopped = self._stop.wait(self.interval)
+            # 本次样本代表从本次采样到下一次采样（或停止）之间的实际时间
+            delta = time.perf_counter() - taken_at
+            for key in keys:
+                self.elapsed[key] += delta
+            if stopped:
+                break
+
+    def to_collapsed(self) -> str:
+        """
+        导出折叠调用栈（每行一个调用栈，从根到叶以分号分隔，末尾为采样次数）
+
+        Returns:
+            str: flamegraph.pl / speedscope 可直接读取的文本
+        """
+        lines = []
+        for (label, stack), count in sorted(self.samples.items(), key=lambda item: -item[1]):
+            frames = [label] + [f"{name} ({os.path.basename(filename)}:{lineno})" for filename, lineno, name in stack]
+            lines.append(f"{';'.join(frame.replace(';', ':') for frame in frames)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def to_pstats(self) -> Dict[FuncKey, Tuple]:
+        """
+        把采样结果换算为 pstats 的统计结构
+
+        调用次数以采样次数代替，自身时间和累计时间取各样本实际代表的墙钟时间之和。
+
+        Returns:
+            Dict: 可由 marshal 写入并被 pstats.Stats 读取的统计数据
+        """
+        # 函数 -> [调用次数, 原生调用次数, 自身时间, 累计时间, {调用者: [同上]}]
+        stats: Dict[FuncKey, list] = {}
+        for key, count in self.samples.items():
+            _, stack = key
+            elapsed = self.elapsed[key]
+            leaf = stack[-1]
+            seen = set()
+            for depth, func in enumerate(stack):
+                entry = stats.setdefault(func, [0, 0, 0.0, 0.0, {}])
+                # 递归调用只计一次累计时间
+                if func not in seen:
+                    seen.add(func)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += elapsed
+                if depth > 0:
+                    edge = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                    edge[0] += count
+                    edge[1] += count
+                    edge[3] += elapsed
+                    if func == leaf and depth == len(stack) - 1:
+                        edge[2] += elapsed
+            stats[leaf][2] += elapsed
+        return {func: (nc, cc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+                for func, (nc, cc, tt, ct, callers) in stats.items()}
+
+
+class JobProfiler:
+    """
+    验证任务剖析管理器
+
+    负责决定是否剖析一个任务（明确请求或按比例抽样），执行剖析并保存结果。
+    同一时间只剖析一个任务，超出每小时上限的任务照常执行但不剖析。
+    """
+
+    def __init__(self, profile_dir: str, mode: str = 'sampling', interval_ms: float = 10,
+                 sample_rate: float = 0.0, max_per_hour: int = 12, max_stored: int = 50,
+                 thread_prefixes: Tuple[str, ...] = ('page-worker-',), threaded: bool = False):
+        """
+        Args:
+            profile_dir: 剖析结果目录
+            mode: 剖析方式，见 MODES
+            interval_ms: 采样间隔（毫秒），不小于1毫秒
+            sample_rate: 未明确请求的任务被自动剖析的比例
+            max_per_hour: 每小时最多剖析的任务数，0表示不限制
+            max_stored: 最多保留的剖析数，超出时删除最早的剖析
+            thread_prefixes: sampling 方式下额外采样的线程名前缀
+            threaded: 页面是否由页面工作线程处理；为True时 cprofile 方式改用 sampling
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知的剖析方式: {mode}，可选: {', '.join(MODES)}")
+        self.logger = logging.getLogger(__name__)
+        if mode == 'cprofile' and threaded:
+            # cProfile 只能剖析启用它的线程，看不到页面工作线程中的识别过程
+            self.logger.warning("页面由工作线程处理，cProfile 无法剖析页面工作，改用 sampling 方式")
+            mode = 'sampling'
+        self.profile_dir = profile_dir
+        self.mode = mode
+        self.interval = max(1.0, interval_ms) / 1000
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.max_per_hour = max(0, max_per_hour)
+        self.max_stored = max(1, max_stored)
+        self.thread_prefixes = thread_prefixes
+        self._lock = threading.Lock()
+        self._active = False
+        self._recent: deque = deque()
+        self._skipped = 0
+        os.makedirs(profile_dir, exist_ok=True)
+
+    @property
+    def formats(self) -> List[str]:
+        """当前剖析方式支持的导出格式"""
+        return ['pstats', 'collapsed'] if self.mode == 'sampling' else ['pstats']
+
+    def _prune(self):
+        """丢弃一小时以前的剖析记录，调用方需持有锁"""
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 3600:
+            self._recent.popleft()
+
+    def _try_begin(self, requested: bool) -> bool:
+        """按请求标记、抽样比例和频率限制决定是否剖析本任务"""
+        if not requested and random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            self._prune()
+            if self._active or (self.max_per_hour and len(self._recent) >= self.max_per_hour):
+                self._skipped += 1
+                self.logger.info("已达到剖析频率上限或有任务正在剖析，本任务不剖析")
+                return False
+            self._active = True
+            self._recent.append(time.monotonic())
+            return True
+
+    @contextmanager
+    def profile(self, label: str, requested: bool = False, metadata: Optional[Dict] = None) -> Iterator[Optional[str]]:
+        """
+        在 with 块内剖析当前线程执行的任务
+
+        Args:
+            label: 任务说明，例如文件名
+            requested: 是否为明确请求的剖析
+            metadata: 随剖析结果保存的附加信息，可在 with 块内继续补充
+
+        Yields:
+            Optional[str]: 剖析ID，本任务不剖析时为None；剖析结果在 with 块结束后保存
+        """
+        if not self._try_begin(requested):
+            yield None
+            return
+
+        profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:4]}"
+        sampler = profiler = None
+        if self.mode == 'sampling':
+            sampler = StackSampler(self.interval, {threading.get_ident()}, self.thread_prefixes, tag=profile_id)
+            sampler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        started_at = datetime.now().isoformat()
+        start = time.perf_counter()
+        try:
+            # 本任务提交给页面调度器的批次带上剖析ID，采样时据此排除其他任务的页面
+            with job_tag(profile_id):
+                yield profile_id
+        finally:
+            duration = time.perf_counter() - start
+            try:
+                if sampler is not None:
+                    sampler.stop()
+                    self._write(profile_id, 'collapsed', sampler.to_collapsed().encode('utf-8'))
+                    self._write(profile_id, 'pstats', marshal.dumps(sampler.to_pstats()))
+                    samples = sampler.sample_count
+                else:
+                    profiler.disable()
+                    profiler.dump_stats(self._path(profile_id, 'pstats'))
+                    samples = None
+                info = {
+                    'id': profile_id,
+                    'label': label,
+                    'mode': self.mode,
+                    'requested': requested,
+                    'started_at': started_at,
+                    'duration_seconds': round(duration, 3),
+                    'interval_ms': self.interval * 1000 if sampler is not None else None,
+                    'measured_interval_ms': round(duration / samples * 1000, 3) if samples else None,
+                    'samples': samples,
+                    'formats': self.formats,
+                }
+                info.update(metadata or {})
+                self._write(profile_id, 'meta', json.dumps(info, ensure_ascii=False, indent=2).encode('utf-8'))
+                self.logger.info(f"任务剖析已保存: {profile_id} ({label}, {duration:.2f} 秒)")
+                self._evict()
+            except Exception as e:
+                self.logger.warning(f"保存剖析结果失败: {e}")
+            finally:
+                with self._lock:
+                    self._active = False
+
+    def _path(self, profile_id: str, fmt: str) -> str:
+        if not _PROFILE_ID_PATTERN.match(profile_id):
+            raise ValueError(f"无效的剖析ID: {profile_id}")
+        suffix = '.json' if fmt == 'meta' else FORMATS[fmt][0]
+        return os.path.join(self.profile_dir, profile_id + suffix)
+
+    def _write(self, profile_id: str, fmt: str, data: bytes):
+        with open(self._path(profile_id, fmt), 'wb') as f:
+            f.write(data)
+
+    def _evict(self):
+        """删除最早的剖析，使保留的剖析数不超过上限"""
+        ids = sorted(name[:-len('.json')] for name in os.listdir(self.profile_dir)
+                     if name.endswith('.json') and _PROFILE_ID_PATTERN.match(name[:-len('.json')]))
+        for profile_id in ids[:-self.max_stored]:
+            for fmt in ('meta',) + tuple(FORMATS):
+                path = self._path(profile_id, fmt)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def list_profiles(self) -> List[Dict]:
+        """
+        列出保存的剖析，最新的在前
+
+        Returns:
+            List[Dict]: 各剖析的附加信息
+        """
+        profiles = []
+        for name in sorted(os.listdir(self.profile_dir), reverse=True):
+            if name.endswith('.json') and _PROFILE_ID_PATTERN.match(name[:-len('.json')]):
+                with open(os.path.join(self.profile_dir, name), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+        return profiles
+
+    def get_profile_path(self, profile_id: str, fmt: str) -> str:
+        """
+        获取剖析结果文件路径
+
+        Args:
+            profile_id: 剖析ID
+            fmt: 导出格式，见 FORMATS
+
+        Returns:
+            str: 文件路径
+
+        Raises:
+            ValueError: 剖析ID或格式无效
+            FileNotFoundError: 剖析不存在或不支持该格式
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"未知的剖析格式: {fmt}")
+        path = self._path(profile_id, fmt)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"剖析结果不存在: {profile_id} ({fmt})")
+        return path
+
+    def stats(self) -> Dict:
+        """
+        获取剖析管理器的运行状态
+
+        Returns:
+            Dict: 剖析方式、最近一小时的剖析数和因频率限制跳过的任务数
+        """
+        with self._lock:
+            self._prune()
+            return {
+                'mode': self.mode,
+                'active': self._active,
+                'profiles_last_hour': len(self._recent),
+                'max_per_hour': self.max_per_hour,
+                'skipped': self._skipped,
+            }
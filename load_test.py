@@ -0,0 +1,482 @@
+"""
+PDF页码校验工具 - HTTP负载测试
+
+按设定的速率并发请求 /upload、/preview 和 /download-report，统计：
+1. 各接口的 p50/p95/p99 延迟（从计划发出时刻算起，含本地排队时间）、吞吐量和错误率
+2. 服务器进程的内存占用 (RSS)
+
+测试文档由脚本生成，页数、页面尺寸和文件大小均可配置。
+服务器可以由脚本启动（可通过 --env 传入不同配置进行对比），
+也可以使用已在运行的地址，或在当前进程中使用 Flask 测试客户端。
+
+--small-job-check 检查在两个大文档验证期间提交的小文档能否很快完成，而不是排在大文档之后。
+
+用法:
+    python load_test.py --start-server --pages 50 --duration 30 --upload-rate 0.5 --preview-rate 2 \\
+        --env PDF_DPI=150 --env PDF_PAGE_WORKERS=4 --json-output run.json
+    python load_test.py --start-server --small-job-check --pages 60 --small-pages 3
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# 页面尺寸（单位: 点）
+PAGE_SIZES = {
+    'a4': (595, 842),
+    'a3': (842, 1191),
+    'a0': (2384, 3370),
+    'letter': (612, 792),
+}
+
+
+def make_synthetic_pdf(pages: int, page_size: str = 'a4', padding_kb: int = 0, seed: int = 0) -> bytes:
+    """
+    生成带页码的测试PDF
+
+    页码位于页面底部中央，与默认的裁剪区域一致；每隔若干页故意写错一个页码。
+
+    Args:
+        pages: 页数
+        page_size: 页面尺寸，见 PAGE_SIZES
+        padding_kb: 每页额外嵌入的随机图像大小（KB），用于模拟扫描件等大文件
+        seed: 随机种子
+
+    Returns:
+        bytes: PDF文件内容
+    """
+    rng = random.Random(seed)
+    width, height = PAGE_SIZES[page_size]
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=width, height=height)
+        page.insert_text((72, 100), f"Synthetic page {i + 1}", fontsize=18)
+        number = i + 1 if (i + 1) % 17 else i + 2
+        page.insert_text((width / 2 - 8, height * 0.95), str(number), fontsize=14)
+        if padding_kb > 0:
+            # 随机像素几乎无法压缩，可以有效增大文件
+            side = max(1, int((padding_kb * 1024 / 3) ** 0.5))
+            samples = bytes(rng.getrandbits(8) for _ in range(side * side * 3))
+            pix = fitz.Pixmap(fitz.csRGB, side, side, samples, False)
+            page.insert_image(fitz.Rect(72, 150, 72 + width / 3, 150 + width / 3), pixmap=pix)
+    data = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return data
+
+
+def encode_multipart(fields: Dict[str, str], files: Dict[str, Tuple[str, bytes, str]]) -> Tuple[bytes, str]:
+    """
+    编码 multipart/form-data 请求体
+
+    Returns:
+        Tuple[bytes, str]: 请求体和 Content-Type
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    for name, (filename, content, mimetype) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {mimetype}\r\n\r\n'.encode('utf-8') + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class HTTPTarget:
+    """通过HTTP访问的被测服务器"""
+
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                content_type: Optional[str] = None) -> int:
+        """
+        发送请求并读取完整响应
+
+        Returns:
+            int: HTTP状态码
+        """
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        if content_type:
+            req.add_header('Content-Type', content_type)
+        req.add_header('Accept-Encoding', 'gzip')
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+class InProcessTarget:
+    """在当前进程中通过 Flask 测试客户端访问的应用"""
+
+    def __init__(self):
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                content_type: Optional[str] = None) -> int:
+        # 测试客户端不是线程安全的，每个线程使用自己的客户端
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        headers = {'Content-Type': content_type} if content_type else {}
+        resp = client.open(path, method=method, data=body, headers=headers)
+        resp.get_data()
+        return resp.status_code
+
+
+class RSSSampler(threading.Thread):
+    """定期采样进程的常驻内存 (RSS)"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop_event = threading.Event()
+
+    def read_rss(self) -> Optional[int]:
+        """
+        读取进程当前的RSS（字节），无法读取时返回None
+        """
+        if psutil is not None:
+            try:
+                return psutil.Process(self.pid).memory_info().rss
+            except psutil.Error:
+                return None
+        try:
+            with open(f'/proc/{self.pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = self.read_rss()
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    计算百分位数（最近秩法）
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def start_server(port: int, env_overrides: Dict[str, str]) -> subprocess.Popen:
+    """
+    启动被测服务器并等待其就绪
+
+    Args:
+        port: 监听端口
+        env_overrides: 额外的环境变量，用于对比不同配置
+
+    Returns:
+        subprocess.Popen: 服务器进程
+    """
+    env = dict(os.environ)
+    env.update({'PDF_HOST': '127.0.0.1', 'PDF_PORT': str(port), 'PDF_DEBUG': 'false', 'PDF_DEBUG_CROPS': 'false'})
+    env.update(env_overrides)
+    proc = subprocess.Popen([sys.executable, 'start.py'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 30
+    target = HTTPTarget(f'http://127.0.0.1:{port}', timeout=2)
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"服务器启动失败，退出码: {proc.returncode}")
+        try:
+            if target.request('GET', '/config') == 200:
+                return proc
+        except OSError:
+            pass
+        time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError("等待服务器就绪超时")
+
+
+def run_load(target, scenarios: Dict[str, Tuple[float, Callable[[], Tuple[str, str, bytes, str]]]],
+             duration: float, concurrency: int) -> Dict[str, List[Tuple[float, Optional[int], Optional[str]]]]:
+    """
+    按固定速率发送请求（开环负载），直到持续时间结束且所有请求完成
+
+    Args:
+        target: HTTPTarget 或 InProcessTarget
+        scenarios: 接口名称到 (每秒请求数, 请求构造函数) 的映射
+        duration: 持续时间（秒）
+        concurrency: 最大并发请求数
+
+    Returns:
+        Dict[str, List[Tuple[float, Optional[int], Optional[str], float]]]: 各接口的 (延迟, 状态码, 异常信息, 排队时间) 列表
+
+    延迟从请求按计划应当发出的时刻算起：并发数用满时请求在本地排队的时间同样计入，
+    避免协调遗漏（coordinated omission）掩盖服务器变慢时的真实延迟。
+    """
+    records = {name: [] for name in scenarios}
+    lock = threading.Lock()
+
+    def send(name: str, build, due: float):
+        method, path, body, content_type = build()
+        queue_delay = max(0.0, time.monotonic() - due)
+        status, error = None, None
+        try:
+            status = target.request(method, path, body, content_type)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        latency = time.monotonic() - due
+        with lock:
+            records[name].append((latency, status, error, queue_delay))
+
+    start = time.monotonic()
+    next_due = {name: start for name, (rate, _) in scenarios.items() if rate > 0}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while next_due:
+            name, due = min(next_due.items(), key=lambda item: item[1])
+            if due - start >= duration:
+                del next_due[name]
+                continue
+            time.sleep(max(0.0, due - time.monotonic()))
+            rate, build = scenarios[name]
+            executor.submit(send, name, build, due)
+            next_due[name] = due + 1.0 / rate
+    return records
+
+
+def run_small_job_check(target, large_pdf: bytes, small_pdf: bytes, max_seconds: float) -> Dict:
+    """
+    先提交两个大文档，在它们验证期间再提交一个小文档，记录各自的完成时间
+
+    Args:
+        target: 被测服务器
+        large_pdf: 大文档内容
+        small_pdf: 小文档内容
+        max_seconds: 小文档允许的最长耗时（秒）
+
+    Returns:
+        Dict: 各请求的状态码和耗时，以及检查是否通过
+    """
+    results: Dict[str, Tuple[Optional[int], float]] = {}
+
+    def upload(name: str, pdf_bytes: bytes):
+        body, content_type = encode_multipart({}, {'file': (f'{name}.pdf', pdf_bytes, 'application/pdf')})
+        start = time.monotonic()
+        try:
+            status = target.request('POST', '/upload', body, content_type)
+        except Exception:
+            status = None
+        results[name] = (status, time.monotonic() - start)
+
+    threads = [threading.Thread(target=upload, args=(f'large_{n}', large_pdf)) for n in range(2)]
+    for thread in threads:
+        thread.start()
+    # 等大文档进入验证后再提交小文档
+    time.sleep(0.5)
+    upload('small', small_pdf)
+    large_running = sum(1 for thread in threads if thread.is_alive())
+    for thread in threads:
+        thread.join()
+
+    small_status, small_seconds = results['small']
+    return {
+        'requests': {name: {'status': status, 'seconds': round(seconds, 3)} for name, (status, seconds) in results.items()},
+        'large_running_when_small_finished': large_running,
+        'passed': small_status == 200 and small_seconds <= max_seconds,
+    }
+
+
+def summarize(records: Dict[str, List[Tuple[float, Optional[int], Optional[str], float]]], wall_time: float) -> Dict:
+    """
+    汇总各接口的延迟、本地排队时间、吞吐量和错误率
+    """
+    summary = {}
+    for name, items in records.items():
+        latencies = [item[0] for item in items]
+        queue_delays = [item[3] for item in items]
+        errors = [item for item in items if item[2] is not None or not (200 <= (item[1] or 0) < 300)]
+        statuses: Dict[str, int] = {}
+        for _, status, error, _ in items:
+            key = str(status) if error is None else 'exception'
+            statuses[key] = statuses.get(key, 0) + 1
+        summary[name] = {
+            'requests': len(items),
+            'errors': len(errors),
+            'error_rate': len(errors) / len(items) if items else 0.0,
+            'throughput_rps': len(items) / wall_time if wall_time > 0 else 0.0,
+            'p50_ms': (percentile(latencies, 50) or 0) * 1000,
+            'p95_ms': (percentile(latencies, 95) or 0) * 1000,
+            'p99_ms': (percentile(latencies, 99) or 0) * 1000,
+            'queue_p95_ms': (percentile(queue_delays, 95) or 0) * 1000,
+            'statuses': statuses,
+            'sample_errors': sorted({item[2] for item in errors if item[2]})[:5],
+        }
+    return summary
+
+
+def main():
+    """
+    主函数 - 命令行接口
+    """
+    parser = argparse.ArgumentParser(description='PDF页码校验工具 HTTP负载测试')
+    target_group = parser.add_mutually_exclusive_group()
+    target_group.add_argument('--url', help='已在运行的服务器地址，例如 http://127.0.0.1:5000')
+    target_group.add_argument('--start-server', action='store_true', help='由本脚本启动服务器 (start.py)')
+    target_group.add_argument('--in-process', action='store_true', help='在当前进程中使用 Flask 测试客户端')
+    parser.add_argument('--port', type=int, default=5055, help='--start-server 时的监听端口')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='传给服务器的环境变量，可重复使用，例如 --env PDF_DPI=150')
+    parser.add_argument('--pages', type=int, default=20, help='测试文档页数')
+    parser.add_argument('--page-size', choices=sorted(PAGE_SIZES), default='a4', help='测试文档页面尺寸')
+    parser.add_argument('--padding-kb', type=int, default=0, help='每页额外嵌入的随机图像大小 (KB)')
+    parser.add_argument('--duration', type=float, default=30, help='发送请求的持续时间（秒）')
+    parser.add_argument('--upload-rate', type=float, default=0.5, help='/upload 每秒请求数')
+    parser.add_argument('--preview-rate', type=float, default=1.0, help='/preview 每秒请求数')
+    parser.add_argument('--report-rate', type=float, default=1.0, help='/download-report 每秒请求数')
+    parser.add_argument('--concurrency', type=int, default=16, help='最大并发请求数')
+    parser.add_argument('--timeout', type=float, default=300, help='单个请求的超时时间（秒）')
+    parser.add_argument('--json-output', help='把结果保存为JSON文件，便于对比不同配置')
+    parser.add_argument('--small-job-check', action='store_true',
+                        help='不运行负载测试，改为检查两个大文档验证期间提交的小文档能否很快完成')
+    parser.add_argument('--small-pages', type=int, default=3, help='--small-job-check 中小文档的页数')
+    parser.add_argument('--small-job-max-seconds', type=float, default=10,
+                        help='--small-job-check 中小文档允许的最长耗时（秒）')
+    args = parser.parse_args()
+
+    env_overrides = {}
+    for item in args.env:
+        key, sep, value = item.partition('=')
+        if not sep:
+            parser.error(f"无效的环境变量: {item}")
+        env_overrides[key] = value
+
+    pdf_bytes = make_synthetic_pdf(args.pages, args.page_size, args.padding_kb)
+    print(f"测试文档: {args.pages} 页 ({args.page_size})，{len(pdf_bytes) / 1024:.1f} KB")
+
+    server = None
+    try:
+        if args.in_process:
+            os.environ.update(env_overrides)
+            target = InProcessTarget()
+            server_pid = os.getpid()
+        elif args.start_server:
+            server = start_server(args.port, env_overrides)
+            target = HTTPTarget(f'http://127.0.0.1:{args.port}', args.timeout)
+            server_pid = server.pid
+        else:
+            target = HTTPTarget(args.url or 'http://127.0.0.1:5000', args.timeout)
+            server_pid = None
+
+        if args.small_job_check:
+            small_pdf = make_synthetic_pdf(args.small_pages, args.page_size, seed=1)
+            check = run_small_job_check(target, pdf_bytes, small_pdf, args.small_job_max_seconds)
+            for name, request in check['requests'].items():
+                print(f"{name:<10}状态码 {request['status']}，耗时 {request['seconds']:.2f} 秒")
+            print(f"小文档完成时仍在验证的大文档: {check['large_running_when_small_finished']}")
+            print(f"检查{'通过' if check['passed'] else '未通过'}: 小文档应在 {args.small_job_max_seconds} 秒内成功完成")
+            if args.json_output:
+                with open(args.json_output, 'w', encoding='utf-8') as f:
+                    json.dump({'config': {**vars(args), 'env': env_overrides}, 'small_job_check': check},
+                              f, ensure_ascii=False, indent=2)
+            sys.exit(0 if check['passed'] else 1)
+
+        rng = random.Random(0)
+
+        def build_upload():
+            body, content_type = encode_multipart({}, {'file': ('load_test.pdf', pdf_bytes, 'application/pdf')})
+            return 'POST', '/upload', body, content_type
+
+        def build_preview():
+            fields = {'page_number': str(rng.randint(1, args.pages))}
+            body, content_type = encode_multipart(fields, {'file': ('load_test.pdf', pdf_bytes, 'application/pdf')})
+            return 'POST', '/preview', body, content_type
+
+        def build_report():
+            lines = '\n'.join(f"第 {i + 1} 页: 期望 {i + 1}, 检测 {i + 1} ✓" for i in range(args.pages))
+            body = json.dumps({'report_content': lines}).encode('utf-8')
+            return 'POST', '/download-report', body, 'application/json'
+
+        scenarios = {
+            'upload': (args.upload_rate, build_upload),
+            'preview': (args.preview_rate, build_preview),
+            'report': (args.report_rate, build_report),
+        }
+
+        sampler = RSSSampler(server_pid) if server_pid else None
+        if sampler:
+            sampler.start()
+        started = time.monotonic()
+        records = run_load(target, scenarios, args.duration, args.concurrency)
+        wall_time = time.monotonic() - started
+        if sampler:
+            sampler.stop()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    summary = summarize(records, wall_time)
+    rss = sampler.samples if sampler else []
+
+    print(f"总耗时: {wall_time:.1f} 秒，配置: {env_overrides or '默认'}")
+    print(f"{'接口':<10}{'请求数':>8}{'错误率':>9}{'吞吐(rps)':>11}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'排队p95(ms)':>13}  状态码")
+    print("-" * 103)
+    for name, stats in summary.items():
+        print(f"{name:<10}{stats['requests']:>8}{stats['error_rate']:>9.1%}{stats['throughput_rps']:>11.2f}"
+              f"{stats['p50_ms']:>10.0f}{stats['p95_ms']:>10.0f}{stats['p99_ms']:>10.0f}{stats['queue_p95_ms']:>13.0f}  {stats['statuses']}")
+        for error in stats['sample_errors']:
+            print(f"    {error}")
+    if rss:
+        print(f"服务器RSS: 峰值 {max(rss) / 1024 / 1024:.1f} MB，结束时 {rss[-1] / 1024 / 1024:.1f} MB")
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'config': {**vars(args), 'env': env_overrides},
+                'wall_time_seconds': wall_time,
+                'endpoints': summary,
+                'rss_peak_bytes': max(rss) if rss else None,
+                'rss_final_bytes': rss[-1] if rss else None,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到: {args.json_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+PDF页码校验工具 - OCR后端
+
+提供可插拔的OCR后端：
+1. tesseract: 调用Tesseract子进程识别任意文本
+2. template: 进程内的数字模板识别器，从同一文档中Tesseract可信识别的纯数字页码学习字形模板
+
+同一文档中页码的字体和字号一致，模板识别器学到足够的数字后，
+大部分页面无需再启动Tesseract子进程；置信度不足或结果与按页码序列预测的页码不一致时回退到下一个后端。
+"""
+
+import abc
+import re
+import threading
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+
+class OCRBackend(abc.ABC):
+    """
+    OCR后端基类
+
+    子类实现 recognize()；可学习的后端还可以实现 learn()。
+    """
+
+    name = 'base'
+
+    @abc.abstractmethod
+    def recognize(self, gray: Image.Image) -> Tuple[Optional[str], float]:
+        """
+        识别灰度图像中的文本
+
+        Args:
+            gray: 灰度裁剪图像
+
+        Returns:
+            Tuple[Optional[str], float]: 识别出的文本（无法识别时为None）和0到1之间的置信度
+        """
+
+    def learn(self, gray: Image.Image, page_number: int):
+        """
+        用已确认的页码训练后端，默认不做任何处理
+
+        Args:
+            gray: 灰度裁剪图像
+            page_number: 已确认的页码
+        """
+
+
+class TesseractBackend(OCRBackend):
+    """基于Tesseract子进程的OCR后端"""
+
+    name = 'tesseract'
+
+    def __init__(self, lang: str = 'eng', config: str = '--psm 6', semaphore: Optional[threading.Semaphore] = None):
+        """
+        Args:
+            lang: Tesseract识别语言
+            config: Tesseract命令行参数
+            semaphore: 限制并发子进程数的信号量，为None时不限制
+        """
+        self.lang = lang
+        self.config = config
+        self.semaphore = semaphore
+
+    def recognize(self, gray: Image.Image) -> Tuple[Optional[str], float]:
+        # 受并发子进程数限制；image_to_data 在同一次调用中给出逐词置信度
+        with self.semaphore or nullcontext():
+            data = pytesseract.image_to_data(gray, lang=self.lang, config=self.config,
+                                             output_type=pytesseract.Output.DICT)
+
+        # 按行重组文本，置信度取各词的最小值
+        lines: Dict[Tuple[int, int, int], List[str]] = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            if not word.strip():
+                continue
+            lines.setdefault((data['block_num'][i], data['par_num'][i], data['line_num'][i]), []).append(word)
+            conf = float(data['conf'][i])
+            if conf >= 0:
+                confidences.append(conf / 100)
+        text = '\n'.join(' '.join(words) for words in lines.values())
+        return text, min(confidences) if confidences else 0.0
+
+
+class TemplateDigitBackend(OCRBackend):
+    """
+    进程内的数字模板识别器
+
+    将裁剪图像二值化后按连通域分割出数字字形，与学到的模板逐个比较。
+    模板只在同一文档内有效，每个文档应使用新的实例。
+    """
+
+    name = 'template'
+
+    # 字形归一化后的尺寸 (宽, 高)
+    GLYPH_SIZE = (16, 24)
+
+    def __init__(self, max_templates_per_digit: int = 3, min_margin: float = 0.1):
+        """
+        Args:
+            max_templates_per_digit: 每个数字最多保存的模板数
+            min_margin: 最佳匹配与其他数字最佳匹配之间的最小差距，差距不足视为不可信
+        """
+        self.max_templates_per_digit = max_templates_per_digit
+        self.min_margin = min_margin
+        self._templates: Dict[str, List[Tuple[np.ndarray, float]]] = {}
+        self._lock = threading.Lock()
+
+    def _segment(self, gray: Image.Image) -> Optional[List[Tuple[np.ndarray, float]]]:
+        """
+        把裁剪图像分割为单行数字字形
+
+        短小的连通域（如 "- 3 -" 中的横线、圆点、噪点）会被忽略；
+        出现多行文本或相距较远的多组字符时返回None，交由其他后端处理。
+
+        Returns:
+            Optional[List[Tuple[np.ndarray, float]]]: 从左到右的归一化字形及其宽高比
+        """
+        arr = np.asarray(gray, dtype=np.uint8)
+        if arr.size == 0 or int(arr.max()) - int(arr.min()) < 40:
+            return None
+
+        _, binary = cv2.threshold(arr, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        boxes = [tuple(int(v) for v in stats[i][:4]) for i in range(1, count) if stats[i][4] >= 4]
+        if not boxes:
+            return None
+
+        # 合并水平方向大幅重叠的连通域（断裂的字形）
+        boxes.sort(key=lambda b: b[0])
+        merged = [list(boxes[0])]
+        for x, y, w, h in boxes[1:]:
+            mx, my, mw, mh = merged[-1]
+            overlap = min(mx + mw, x + w) - max(mx, x)
+            if overlap > 0.5 * min(mw, w):
+                nx, ny = min(mx, x), min(my, y)
+                merged[-1] = [nx, ny, max(mx + mw, x + w) - nx, max(my + mh, y + h) - ny]
+            else:
+                merged.append([x, y, w, h])
+
+        max_h = max(b[3] for b in merged)
+        glyph_boxes = [b for b in merged if b[3] >= 0.6 * max_h]
+
+        # 所有字形必须位于同一行且彼此相邻
+        centers = [b[1] + b[3] / 2 for b in glyph_boxes]
+        median_center = float(np.median(centers))
+        if any(abs(c - median_center) > 0.3 * max_h for c in centers):
+            return None
+        for prev, cur in zip(glyph_boxes, glyph_boxes[1:]):
+            if cur[0] - (prev[0] + prev[2]) > 1.5 * max_h:
+                return None
+
+        glyphs = []
+        for x, y, w, h in glyph_boxes:
+            glyph = cv2.resize(binary[y:y + h, x:x + w], self.GLYPH_SIZE, interpolation=cv2.INTER_AREA)
+            glyphs.append((glyph.astype(np.float32) / 255.0, w / h))
+        return glyphs
+
+    @staticmethod
+    def _similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """归一化相关系数，取值 -1 到 1"""
+        da = a - a.mean()
+        db = b - b.mean()
+        denom = float(np.sqrt((da * da).sum() * (db * db).sum()))
+        if denom == 0:
+            return 0.0
+        return float((da * db).sum() / denom)
+
+    def recognize(self, gray: Image.Image) -> Tuple[Optional[str], float]:
+        # 尚未学到模板时无需分割图像
+        with self._lock:
+            templates = {digit: list(items) for digit, items in self._templates.items()}
+        if not templates:
+            return None, 0.0
+
+        glyphs = self._segment(gray)
+        if not glyphs:
+            return None, 0.0
+
+        digits = []
+        confidence = 1.0
+        for glyph, aspect in glyphs:
+            scores = {}
+            for digit, items in templates.items():
+                best = -1.0
+                for template, template_aspect in items:
+                    # 宽高比相差过大（例如 "1" 与其他数字）时不参与比较
+                    if abs(np.log(aspect / template_aspect)) > 0.35:
+                        continue
+                    best = max(best, self._similarity(glyph, template))
+                scores[digit] = best
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            best_digit, best_score = ranked[0]
+            runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+            if best_score - runner_up < self.min_margin:
+                return None, 0.0
+            digits.append(best_digit)
+            confidence = min(confidence, max(0.0, best_score))
+
+        return ''.join(digits), confidence
+
+    def learn(self, gray: Image.Image, page_number: int):
+        text = str(page_number)
+        with self._lock:
+            if all(len(self._templates.get(d, [])) >= self.max_templates_per_digit for d in text):
+                return
+
+        glyphs = self._segment(gray)
+        if not glyphs or len(glyphs) != len(text):
+            return
+
+        with self._lock:
+            for digit, glyph in zip(text, glyphs):
+                items = self._templates.setdefault(digit, [])
+                if len(items) < self.max_templates_per_digit:
+                    items.append(glyph)
+
+
+# 可用的OCR后端，键为配置中使用的名称
+OCR_BACKENDS = {
+    TesseractBackend.name: TesseractBackend,
+    TemplateDigitBackend.name: TemplateDigitBackend,
+}
+
+
+class OCRChain:
+    """
+    按顺序组合的OCR后端
+
+    依次尝试各个后端，置信度不足时回退到下一个，最后一个后端的结果总是被采用。
+    提供期望页码时，前面的后端只有识别结果与期望页码一致才会被采用，
+    不一致的页面（通常是真正的错误页）总是由最后一个后端确认。
+
+    期望页码由之前检测到的页码按序列推算（见 predict()），
+    因此页码与页面索引存在固定偏移的文档（例如正文从第5页起编为1）同样可以使用模板。
+    """
+
+    # 纯数字读数：只有一组数字，两侧可以有 "- 3 -"、". 3 ." 这类标点装饰
+    DIGIT_ONLY = re.compile(r'[^\w]*(\d+)[^\w]*')
+
+    def __init__(self, backends: List[OCRBackend], min_confidence: float = 0.85):
+        """
+        Args:
+            backends: 按优先级排列的后端列表，不能为空
+            min_confidence: 采用非最后一个后端结果所需的最低置信度
+        """
+        if not backends:
+            raise ValueError("至少需要一个OCR后端")
+        self.backends = backends
+        self.min_confidence = min_confidence
+        self.usage = {backend.name: 0 for backend in backends}
+        self._detected: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def authoritative(self) -> str:
+        """最后一个（结果总被采用的）后端名称"""
+        return self.backends[-1].name
+
+    def predict(self, page_index: int) -> int:
+        """
+        按之前检测到的页码推算指定页面的页码
+
+        以索引小于该页、距离最近的已检测页面为基准，页码随页面索引逐页递增；
+        还没有可参考的页面时假定页码从1开始。
+
+        Args:
+            page_index: 页面索引（从0开始）
+
+        Returns:
+            int: 推算的页码
+        """
+        with self._lock:
+            previous = max((i for i in self._detected if i < page_index), default=None)
+            if previous is None:
+                return page_index + 1
+            return self._detected[previous] + page_index - previous
+
+    def recognize(self, gray: Image.Image, expected: Optional[int] = None) -> Tuple[Optional[str], str, float]:
+        """
+        识别灰度图像中的文本
+
+        Args:
+            gray: 灰度裁剪图像
+            expected: 期望页码，为None时不做一致性检查
+
+        Returns:
+            Tuple[Optional[str], str, float]: 识别出的文本、实际采用的后端名称和该后端给出的置信度
+        """
+        for backend in self.backends[:-1]:
+            text, confidence = backend.recognize(gray)
+            if text is None or confidence < self.min_confidence:
+                continue
+            if expected is not None and text.strip() != str(expected):
+                continue
+            return self._record(text, backend.name, confidence)
+
+        last = self.backends[-1]
+        text, confidence = last.recognize(gray)
+        return self._record(text, last.name, confidence)
+
+    def _record(self, text: Optional[str], name: str, confidence: float) -> Tuple[Optional[str], str, float]:
+        with self._lock:
+            self.usage[name] += 1
+        return text, name, confidence
+
+    def observe(self, gray: Image.Image, page_index: int, page_number: int, text: str, backend_name: str,
+                confidence: float):
+        """
+        记录某页检测到的页码，供后续页面推算期望页码
+
+        最后一个后端以足够置信度给出的纯数字读数还会用于训练可学习的后端，
+        与页面索引是否对应无关。
+
+        Args:
+            gray: 灰度裁剪图像
+            page_index: 页面索引（从0开始）
+            page_number: 检测到的页码
+            text: 后端识别出的原始文本
+            backend_name: 给出该结果的后端名称
+            confidence: 该后端给出的置信度
+        """
+        with self._lock:
+            self._detected[page_index] = page_number
+        match = self.DIGIT_ONLY.fullmatch(text.strip())
+        if (backend_name == self.authoritative and confidence >= self.min_confidence
+                and match and int(match.group(1)) == page_number):
+            self.learn(gray, page_number)
+
+    def learn(self, gray: Image.Image, page_number: int):
+        """
+        用已确认的页码训练所有可学习的后端
+
+        Args:
+            gray: 灰度裁剪图像
+            page_number: 已确认的页码
+        """
+        for backend in self.backends:
+            backend.learn(gray, page_number)
+
+
+def create_ocr_chain(names: List[str], semaphore: Optional[threading.Semaphore] = None,
+                     min_confidence: float = 0.85) -> OCRChain:
+    """
+    按名称创建OCR后端链，每个文档应创建新的后端链
+
+    Args:
+        names: 按优先级排列的后端名称，见 OCR_BACKENDS
+        semaphore: Tesseract并发子进程信号量
+        min_confidence: 采用非最后一个后端结果所需的最低置信度
+
+    Returns:
+        OCRChain: 后端链
+
+    Raises:
+        ValueError: 后端名称无效
+    """
+    backends = []
+    for name in names:
+        if name not in OCR_BACKENDS:
+            raise ValueError(f"未知的OCR后端: {name}，可选: {', '.join(OCR_BACKENDS)}")
+        if name == TesseractBackend.name:
+            backends.append(TesseractBackend(semaphore=semaphore))
+        else:
+            backends.append(OCR_BACKENDS[name]())
+    return OCRChain(backends, min_confidence=min_confidence)
@@ -0,0 +1,112 @@
+"""
+PDF页码校验工具 - 页面结果缓存
+
+按页面内容指纹缓存单页识别结果。编辑修改少数页面后重新上传整份PDF时，
+未改动的页面可直接复用之前的识别结果，无需重新渲染和OCR。
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import fitz  # PyMuPDF
+
+
+def page_fingerprint(doc: fitz.Document, page: fitz.Page) -> str:
+    """
+    计算页面内容指纹
+
+    指纹由页面内容流、页面尺寸与旋转角度，以及页面引用的图像、表单对象、嵌入字体程序和
+    注释（含表单控件）的外观流组成。渲染页面时会绘制注释，盖章或贝茨编号工具常以注释形式添加页码，
+    因此注释的修改也会改变指纹。
+    这些内容与对象编号无关，因此同一页面在重新保存后的PDF中仍得到相同的指纹。
+
+    Args:
+        doc: 页面所属的文档
+        page: 要计算指纹的页面
+
+    Returns:
+        str: 十六进制SHA-256摘要
+    """
+    h = hashlib.sha256()
+    h.update(page.read_contents())
+    h.update(repr((tuple(page.rect), page.rotation)).encode('utf-8'))
+
+    # 图像和表单对象（XObject）的内容不在页面内容流中，需要单独加入
+    for img in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(img[0]) or b'')
+    for xobj in page.get_xobjects():
+        h.update(doc.xref_stream_raw(xobj[0]) or b'')
+
+    # 字体按名称和嵌入的字体程序区分，同名字体的替换同样会改变渲染结果
+    for font in page.get_fonts(full=True):
+        h.update(font[3].encode('utf-8', 'replace'))
+        h.update(doc.extract_font(font[0])[3] or b'')
+
+    # 注释按位置、类型、标志和外观流区分；没有外观流的注释使用其文字内容
+    for annot in list(page.annots()) + list(page.widgets()):
+        h.update(repr((annot.type[0], tuple(annot.rect), annot.flags)).encode('utf-8'))
+        kind, value = doc.xref_get_key(annot.xref, 'AP/N')
+        if kind == 'xref':
+            h.update(doc.xref_stream_raw(int(value.split()[0])) or b'')
+        else:
+            h.update(value.encode('utf-8', 'replace'))
+            h.update(annot.info.get('content', '').encode('utf-8', 'replace'))
+
+    return h.hexdigest()
+
+
+class PageResultCache:
+    """
+    线程安全的单页识别结果缓存（LRU淘汰）
+
+    缓存值包含识别到的页码和裁剪图片，可在多个验证器实例之间共享。
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多保存的页面结果数，超出时淘汰最久未使用的条目
+        """
+        self.max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        读取缓存的页面结果
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[Dict]: 缓存的结果，未命中时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, value: Dict):
+        """
+        写入页面结果
+
+        Args:
+            key: 缓存键
+            value: 页面识别结果
+        """
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
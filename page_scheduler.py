@@ -0,0 +1,285 @@
+"""
+PDF页码校验工具 - 页面调度器
+
+把验证任务拆分为若干页面批次（工作单元），由共享的工作线程池执行。
+调度器在并发任务之间公平地分配工作线程，使小文档不必排在大文档之后，
+支持以下策略：
+1. round_robin: 各任务轮流执行一个批次
+2. shortest_remaining: 优先执行剩余批次最少的任务
+3. fifo: 按提交顺序执行
+
+另外可以为每个客户端设置同时执行的批次数上限（配额）。
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+# 当前线程所属任务的标签；工作线程执行某个任务的批次时沿用提交该任务的线程所设置的标签
+_job_context = threading.local()
+# 线程ID -> 任务标签，供其他线程（例如剖析器的采样线程）查询
+_thread_tags: Dict[int, Hashable] = {}
+_thread_tags_lock = threading.Lock()
+
+
+@contextmanager
+def job_tag(tag: Optional[Hashable]) -> Iterator[None]:
+    """
+    在 with 块内为当前线程设置任务标签
+
+    在 with 块内提交给调度器的任务会记住该标签，工作线程执行其批次时带上同一标签，
+    剖析器据此只采样属于被剖析任务的页面工作线程。
+
+    Args:
+        tag: 任务标签，为None时清除标签
+    """
+    ident = threading.get_ident()
+    previous = getattr(_job_context, 'tag', None)
+    _job_context.tag = tag
+    with _thread_tags_lock:
+        if tag is None:
+            _thread_tags.pop(ident, None)
+        else:
+            _thread_tags[ident] = tag
+    try:
+        yield
+    finally:
+        _job_context.tag = previous
+        with _thread_tags_lock:
+            if previous is None:
+                _thread_tags.pop(ident, None)
+            else:
+                _thread_tags[ident] = previous
+
+
+def current_job_tag() -> Optional[Hashable]:
+    """当前线程的任务标签，未设置时为None"""
+    return getattr(_job_context, 'tag', None)
+
+
+def thread_job_tags() -> Dict[int, Hashable]:
+    """
+    获取各线程当前的任务标签
+
+    Returns:
+        Dict[int, Hashable]: 线程ID到任务标签的映射，只包含设置了标签的线程
+    """
+    with _thread_tags_lock:
+        return dict(_thread_tags)
+
+
+class _Job:
+    """调度器内部使用的任务记录"""
+
+    def __init__(self, job_id: int, units: List[Callable[[], None]], client: Optional[str], label: Optional[str],
+                 tag: Optional[Hashable] = None):
+        self.job_id = job_id
+        self.client = client
+        self.label = label
+        self.tag = tag
+        self.pending = deque(enumerate(units))
+        self.total_units = len(units)
+        self.in_flight = 0
+        self.completed = 0
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.monotonic()
+        self.first_started_at: Optional[float] = None
+        self.done = threading.Event()
+
+    @property
+    def remaining(self) -> int:
+        return len(self.pending) + self.in_flight
+
+
+class PageScheduler:
+    """
+    公平的页面批次调度器
+
+    调用 run() 提交一个任务的全部工作单元，并阻塞直到它们全部完成。
+    """
+
+    POLICIES = ('round_robin', 'shortest_remaining', 'fifo')
+
+    def __init__(self, workers: int, policy: str = 'round_robin', client_quota: int = 0):
+        """
+        初始化调度器并启动工作线程
+
+        Args:
+            workers: 工作线程数
+            policy: 调度策略，取值见 POLICIES
+            client_quota: 每个客户端同时执行的批次数上限，0表示不限制
+
+        Raises:
+            ValueError: 调度策略无效
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的调度策略: {policy}，可选: {', '.join(self.POLICIES)}")
+
+        self.logger = logging.getLogger(__name__)
+        self.workers = max(1, workers)
+        self.policy = policy
+        self.client_quota = max(0, client_quota)
+
+        self._cond = threading.Condition()
+        self._jobs: "OrderedDict[int, _Job]" = OrderedDict()
+        self._client_in_flight: Dict[Optional[str], int] = defaultdict(int)
+        self._job_ids = itertools.count(1)
+        self._last_served: Optional[int] = None
+        self._shutdown = False
+
+        # 统计数据
+        self._decisions = 0
+        self._recent_decisions = deque(maxlen=50)
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"page-worker-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def run(self, units: List[Callable[[], None]], client: Optional[str] = None, label: Optional[str] = None):
+        """
+        提交一个任务的全部工作单元并等待完成
+
+        任一工作单元抛出异常时，该任务尚未开始的工作单元会被丢弃，异常在调用线程中重新抛出。
+        调用线程的任务标签（见 job_tag()）在工作线程执行本任务的批次时同样生效。
+
+        Args:
+            units: 工作单元列表，每个单元是一个无参数的可调用对象
+            client: 客户端标识，用于配额统计
+            label: 任务说明，仅用于日志和统计
+        """
+        if not units:
+            return
+
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("调度器已关闭")
+            job = _Job(next(self._job_ids), units, client, label, current_job_tag())
+            self._jobs[job.job_id] = job
+            self.logger.info(f"任务 #{job.job_id} ({label}) 已提交: {job.total_units} 个批次，当前任务数: {len(self._jobs)}")
+            self._cond.notify_all()
+
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+
+    def _eligible(self, job: _Job) -> bool:
+        if not job.pending:
+            return False
+        return self.client_quota == 0 or self._client_in_flight.get(job.client, 0) < self.client_quota
+
+    def _pick(self) -> Optional[Tuple[_Job, int, Callable[[], None]]]:
+        """
+        按调度策略选择下一个要执行的工作单元，调用方需持有锁
+
+        Returns:
+            Optional[Tuple[_Job, int, Callable]]: 任务、单元序号和工作单元；无可执行单元时返回None
+        """
+        candidates = [job for job in self._jobs.values() if self._eligible(job)]
+        if not candidates:
+            return None
+
+        if self.policy == 'shortest_remaining':
+            job = min(candidates, key=lambda j: (j.remaining, j.submitted_at))
+        elif self.policy == 'round_robin' and self._last_served is not None:
+            # 选择上次服务的任务之后的第一个候选任务，没有则从头开始
+            later = [j for j in candidates if j.job_id > self._last_served]
+            job = later[0] if later else candidates[0]
+        else:
+            job = candidates[0]
+
+        index, unit = job.pending.popleft()
+        return job, index, unit
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                picked = self._pick()
+                while picked is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    picked = self._pick()
+
+                job, index, unit = picked
+                job.in_flight += 1
+                self._client_in_flight[job.client] += 1
+                self._last_served = job.job_id
+                self._decisions += 1
+                if job.first_started_at is None:
+                    job.first_started_at = time.monotonic()
+                self._recent_decisions.append({
+                    'time': time.time(),
+                    'job_id': job.job_id,
+                    'client': job.client,
+                    'unit': index,
+                    'worker': threading.current_thread().name,
+                })
+                self.logger.debug(f"调度任务 #{job.job_id} 的第 {index + 1}/{job.total_units} 个批次")
+
+            error = None
+            try:
+                with job_tag(job.tag):
+                    unit()
+            except BaseException as e:
+                error = e
+
+            with self._cond:
+                job.in_flight -= 1
+                job.completed += 1
+                self._client_in_flight[job.client] -= 1
+                if self._client_in_flight[job.client] == 0:
+                    del self._client_in_flight[job.client]
+                if error is not None and job.error is None:
+                    job.error = error
+                    job.pending.clear()
+                if not job.pending and job.in_flight == 0:
+                    self._jobs.pop(job.job_id, None)
+                    job.done.set()
+                # 配额释放后其他工作线程可能有新的候选单元
+                self._cond.notify_all()
+
+    def shutdown(self):
+        """
+        停止工作线程；已在执行的工作单元会运行完毕
+        """
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """
+        获取调度器的运行状态
+
+        Returns:
+            Dict: 调度策略、各任务队列深度和最近的调度决策
+        """
+        now = time.monotonic()
+        with self._cond:
+            jobs = [{
+                'job_id': job.job_id,
+                'client': job.client,
+                'label': job.label,
+                'queued_units': len(job.pending),
+                'in_flight_units': job.in_flight,
+                'completed_units': job.completed,
+                'total_units': job.total_units,
+                'age_seconds': now - job.submitted_at,
+                'start_delay_seconds': (job.first_started_at - job.submitted_at) if job.first_started_at else None,
+            } for job in self._jobs.values()]
+            return {
+                'policy': self.policy,
+                'workers': self.workers,
+                'client_quota': self.client_quota,
+                'queued_units': sum(len(job.pending) for job in self._jobs.values()),
+                'decisions_total': self._decisions,
+                'jobs': jobs,
+                'recent_decisions': list(self._recent_decisions),
+            }
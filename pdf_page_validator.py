@@ -24,13 +24,24 @@ import logging
 from pathlib import Path
 from pytesseract import TesseractNotFoundError
 import io
-from config import OCRConfig
+import threading
+import time
+from contextlib import nullcontext
+from config import OCRConfig, RenderConfig
+from page_cache import PageResultCache, page_fingerprint
+from job_control import CancellationToken, JobCancelledError
+from page_scheduler import PageScheduler
+from ocr_backends import OCRChain, create_ocr_chain
+from job_profiler import MODES, JobProfiler
+from sharding import document_sha256
+from render_budget import BYTES_PER_PIXEL, MemoryBudget, budgeted_dpi, estimate_pixels
 import base64
+import json
 
-# 解决 DecompressionBombError
-# 通过将 MAX_IMAGE_PIXELS 设置为 None，可以禁用 Pillow 的图像大小限制，
-# 从而允许处理从高分辨率PDF页面生成的大尺寸图像。
-Image.MAX_IMAGE_PIXELS = None
+# Pillow 的图像大小限制与单页像素预算保持一致：
+# 页面渲染已按预算降低分辨率，超出预算的图像只可能来自异常输入。
+# 预算设为0时禁用限制。
+Image.MAX_IMAGE_PIXELS = RenderConfig.MAX_PIXELS_PER_PAGE or None
 
 
 class PDFPageValidator:
@@ -40,19 +51,41 @@ class PDFPageValidator:
     用于验证PDF文档中页码的正确性和连续性。
     """
     
-    def __init__(self, tesseract_path: Optional[str] = None):
+    def __init__(self, tesseract_path: Optional[str] = None, ocr_semaphore: Optional[threading.Semaphore] = None,
+                 page_cache: Optional[PageResultCache] = None, scheduler: Optional[PageScheduler] = None,
+                 batch_size: int = 4, ocr_backends: Optional[List[str]] = None,
+                 max_pixels_per_page: Optional[int] = None, max_job_memory_bytes: Optional[int] = None):
         """
         初始化PDF页码校验器
         
         Args:
             tesseract_path: Tesseract OCR引擎的安装路径，如果为None则使用系统默认路径
+            ocr_semaphore: 用于限制并发Tesseract子进程数的信号量，多个实例可共享；为None时不限制
+            page_cache: 按页面内容指纹保存识别结果的缓存，多个实例可共享；为None时每页都重新识别
+            scheduler: 共享的页面调度器，为None时在调用线程中逐页处理
+            batch_size: 交给调度器的每个批次包含的页数
+            ocr_backends: 按优先级排列的OCR后端名称，为None时使用配置文件中的设置
+            max_pixels_per_page: 单页渲染的像素预算，为None时使用配置文件中的设置，0表示不限制
+            max_job_memory_bytes: 单个任务同时渲染的页面内存上限（字节），为None时使用配置文件中的设置，0表示不限制
             
         Raises:
             TesseractNotFoundError: 当Tesseract未安装或路径不正确时抛出
         """
         self.logger = self._setup_logging()
+        self.ocr_semaphore = ocr_semaphore
+        self.page_cache = page_cache
+        self.scheduler = scheduler
+        self.batch_size = batch_size
+        self.ocr_backends = ocr_backends or OCRConfig.OCR_BACKENDS
+        # 校验后端名称，并作为未指定后端链时的默认选择（仅Tesseract）
+        create_ocr_chain(self.ocr_backends)
+        self._default_ocr = create_ocr_chain(['tesseract'], semaphore=ocr_semaphore)
+        self.max_pixels_per_page = RenderConfig.MAX_PIXELS_PER_PAGE if max_pixels_per_page is None else max_pixels_per_page
+        self.max_job_memory_bytes = (RenderConfig.MAX_JOB_MEMORY_MB * 1024 * 1024
+                                     if max_job_memory_bytes is None else max_job_memory_bytes)
         
         # 配置Tesseract
+        # 注意：tesseract_cmd 是进程级全局变量，所有实例应使用同一路径
         if tesseract_path:
             pytesseract.pytesseract.tesseract_cmd = tesseract_path
         
@@ -126,7 +159,9 @@ class PDFPageValidator:
                 return None
 
             page = doc.load_page(page_num)
-            mat = fitz.Matrix(dpi / 72, dpi / 72)
+            # 超大页面按像素预算降低预览分辨率
+            render_dpi = budgeted_dpi(page.rect, dpi, self.max_pixels_per_page)
+            mat = fitz.Matrix(render_dpi / 72, render_dpi / 72)
             pix = page.get_pixmap(matrix=mat)
             doc.close()
 
@@ -140,14 +175,19 @@ class PDFPageValidator:
             self.logger.error(f"为 {os.path.basename(pdf_path)} 生成页面预览时出错: {e}", exc_info=True)
             return None
 
-    def extract_page_number(self, image: Image.Image, crop_areas: List[Tuple[int, int, int, int]], page_index: int) -> Tuple[Optional[int], Optional[Image.Image]]:
+    def extract_page_number(self, image: Image.Image, crop_areas: List[Tuple[int, int, int, int]], page_index: int,
+                            ocr: Optional[OCRChain] = None) -> Tuple[Optional[int], Optional[Image.Image]]:
         """
         从页面图像的指定区域中提取页码，并始终返回对应的裁剪图片。
 
+        期望页码按本文档之前检测到的页码推算；最终后端（Tesseract）给出的可信纯数字读数
+        会用于训练后端链中可学习的后端。
+
         Args:
             image: 完整的页面图像。
             crop_areas: 一个包含多个区域元组的列表，格式为 (left, top, right, bottom)。
             page_index: 当前页码索引，用于调试文件名。
+            ocr: 当前文档的OCR后端链，为None时仅使用Tesseract。
 
         Returns:
             Tuple[Optional[int], Optional[Image.Image]]: 提取到的页码（可能为None）和对应的裁剪图片。
@@ -170,8 +210,11 @@ class PDFPageValidator:
             # 转换为灰度图像以提高识别率
             gray = cropped_image.convert('L')
             
-            # 使用Tesseract进行OCR识别
-            text = pytesseract.image_to_string(gray, lang='eng', config='--psm 6')
+            # 使用OCR后端链进行识别
+            ocr = ocr or self._default_ocr
+            expected = ocr.predict(page_index)
+            text, backend_name, confidence = ocr.recognize(gray, expected=expected)
+            text = text or ''
             
             # 使用正则表达式查找页码
             patterns = [
@@ -188,7 +231,8 @@ class PDFPageValidator:
                 if matches:
                     # 找到第一个匹配的数字就立刻返回
                     page_num = int(matches[0])
-                    self.logger.debug(f"在区域中识别到页码: {page_num}")
+                    self.logger.debug(f"在区域中识别到页码: {page_num} (后端: {backend_name})")
+                    ocr.observe(gray, page_index, page_num, text, backend_name, confidence)
                     return page_num, cropped_image
             
             
@@ -201,17 +245,156 @@ class PDFPageValidator:
             # 发生异常时，不返回图片
             return None, None
     
-    def validate_page_numbers(self, pdf_path: str, dpi: int = 300, crop_data: Optional[Dict[str, float]] = None) -> Dict:
+    def _validate_page(self, doc: fitz.Document, page_index: int, dpi: int, crop_percents: Tuple[float, float, float, float],
+                       crop_signature: str, ocr: Optional[OCRChain] = None,
+                       memory: Optional[MemoryBudget] = None) -> Tuple[Dict, bool]:
+        """
+        识别单个页面的页码并生成该页的验证结果
+
+        Args:
+            doc: 已打开的PDF文档
+            page_index: 页面索引（从0开始）
+            dpi: 图像分辨率
+            crop_percents: 裁剪区域 (x_start, y_start, width, height)，均为百分比
+            crop_signature: 分辨率与裁剪区域的签名，用于组成缓存键
+            ocr: 当前文档的OCR后端链
+            memory: 当前任务的渲染内存预算
+
+        Returns:
+            Tuple[Dict, bool]: 该页的验证结果，以及结果是否复用自缓存
+        """
+        total_pages = len(doc)
+        actual_number = page_index + 1
+        page = doc.load_page(page_index)
+
+        # 内容未变且期望页码未移动的页面，直接复用之前的识别结果
+        cache_key = None
+        if self.page_cache is not None:
+            cache_key = f"{page_fingerprint(doc, page)}:{crop_signature}:{actual_number}"
+            cached = self.page_cache.get(cache_key)
+            if cached is not None:
+                page_num = cached['detected_number']
+                self.logger.info(f"第 {page_index + 1}/{total_pages} 页内容未变，复用页码: {page_num}")
+                return {
+                    'page_index': page_index,
+                    'actual_number': actual_number,
+                    'detected_number': page_num,
+                    'is_valid': actual_number == page_num,
+                    'cropped_image_b64': cached['cropped_image_b64'],
+                    'render_dpi': None,
+                    'render_bytes': 0
+                }, True
+
+        x_start_percent, y_start_percent, width_percent, height_percent = crop_percents
+
+        # 只渲染需要识别的区域；旋转页面的坐标换算较复杂，仍渲染整页后裁剪
+        page_rect = page.rect
+        clip = None
+        render_rect = page_rect
+        if page.rotation == 0:
+            clip = fitz.Rect(
+                page_rect.x0 + page_rect.width * x_start_percent,
+                page_rect.y0 + page_rect.height * y_start_percent,
+                page_rect.x0 + page_rect.width * (x_start_percent + width_percent),
+                page_rect.y0 + page_rect.height * (y_start_percent + height_percent)
+            ) & page_rect
+            render_rect = clip
+
+        # 按像素预算和任务内存上限确定实际分辨率
+        max_pixels = self.max_pixels_per_page
+        if self.max_job_memory_bytes:
+            job_pixels = self.max_job_memory_bytes // BYTES_PER_PIXEL
+            max_pixels = min(max_pixels, job_pixels) if max_pixels else job_pixels
+        render_dpi = budgeted_dpi(render_rect, dpi, max_pixels)
+        if render_dpi < dpi:
+            self.logger.warning(f"第 {page_index + 1} 页尺寸过大，渲染分辨率从 {dpi} 降至 {render_dpi:.0f} DPI")
+        estimated_bytes = estimate_pixels(render_rect, render_dpi) * BYTES_PER_PIXEL
+
+        with memory.reserve(estimated_bytes) if memory is not None else nullcontext() as reservation:
+            # 渲染为图像，直接使用像素数据，避免PNG编码和解码
+            mat = fitz.Matrix(render_dpi/72, render_dpi/72)
+            pix = page.get_pixmap(matrix=mat, clip=clip, alpha=False)
+            render_bytes = len(pix.samples)
+            if reservation is not None:
+                reservation.resize(render_bytes)
+            image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+            del pix
+            
+            width, height = image.size
+
+            if clip is not None:
+                regions_to_scan = [(0, 0, width, height)]
+            else:
+                x_start = int(width * x_start_percent)
+                crop_width = int(width * width_percent)
+                y_start = int(height * y_start_percent)
+                crop_height = int(height * height_percent)
+
+                left, top = x_start, y_start
+                right, bottom = x_start + crop_width, y_start + crop_height
+
+                regions_to_scan = [(left, top, right, bottom)]
+
+            page_num, cropped_img = self.extract_page_number(image, crop_areas=regions_to_scan, page_index=page_index, ocr=ocr)
+            del image
+        self.logger.info(f"第 {page_index + 1}/{total_pages} 页检测到页码: {page_num} (渲染内存: {render_bytes / 1024 / 1024:.1f} MB)")
+
+        # 将裁剪的图片转换为Base64
+        cropped_img_b64 = None
+        if cropped_img:
+            buffered = io.BytesIO()
+            cropped_img.save(buffered, format="PNG")
+            img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
+            cropped_img_b64 = f"data:image/png;base64,{img_str}"
+
+        # 识别过程出错（未返回裁剪图片）时不写入缓存，下次重新识别
+        if cache_key is not None and cropped_img is not None:
+            self.page_cache.put(cache_key, {
+                'detected_number': page_num,
+                'cropped_image_b64': cropped_img_b64
+            })
+
+        return {
+            'page_index': page_index,
+            'actual_number': actual_number,
+            'detected_number': page_num,
+            'is_valid': actual_number == page_num,
+            'cropped_image_b64': cropped_img_b64,
+            'render_dpi': round(render_dpi, 1),
+            'render_bytes': render_bytes
+        }, False
+
+    def validate_page_numbers(self, pdf_path: str, dpi: int = 300, crop_data: Optional[Dict[str, float]] = None,
+                              time_budget: Optional[float] = None,
+                              cancel_token: Optional[CancellationToken] = None,
+                              client_id: Optional[str] = None,
+                              page_range: Optional[Tuple[int, Optional[int]]] = None,
+                              stride: int = 1) -> Dict:
         """
         验证PDF文档的页码，采用逐页处理以优化内存使用。
         
+        每页处理前检查时间预算和取消令牌：预算耗尽时停止并返回已处理页面的部分结果
+        （incomplete 为 True）；任务被取消时立即中止。
+        配置了页面调度器时，页面按批次交给共享的工作线程池处理，与其他任务公平分配。
+        
+        指定 page_range 或 stride 时只验证文档的一个分片，结果中的 shard 字段记录文档哈希、
+        页面范围和识别设置，各分片结果可由 sharding.py 合并为完整结果。
+        
         Args:
             pdf_path: PDF文件路径
             dpi: 图像分辨率，默认300
             crop_data: 用户通过前端选择的裁剪区域坐标（百分比）
+            time_budget: 时间预算（秒），为None时不限制
+            cancel_token: 取消令牌，为None时不可取消
+            client_id: 客户端标识，用于调度器的配额统计
+            page_range: 要验证的页面索引范围 (起始, 结束)，从0开始且不含结束页，结束为None时到文档末尾
+            stride: 页面索引步长，例如多台机器交错分配页面
             
         Returns:
             Dict: 包含验证结果的字典。
+            
+        Raises:
+            JobCancelledError: 任务被取消
         """
         try:
             if not os.path.exists(pdf_path):
@@ -220,96 +403,145 @@ class PDFPageValidator:
             # 根据是否存在crop_data决定日志信息
             mode = "用户自定义区域" if crop_data else "默认配置区域"
             self.logger.info(f"开始验证PDF文档: {pdf_path} (模式: {mode})")
+            deadline = time.monotonic() + time_budget if time_budget else None
 
-            doc = fitz.open(pdf_path)
-            total_pages = len(doc)
-            actual_sequence = list(range(1, total_pages + 1))
-            detected_numbers = []
-            validation_results = []
+            # --- 根据传入的crop_data或config计算裁剪区域 ---
+            if crop_data:
+                x_start_percent = crop_data.get('x_start_percent', 0.40)
+                width_percent = crop_data.get('width_percent', 0.20)
+                y_start_percent = crop_data.get('y_start_percent', 0.90)
+                height_percent = crop_data.get('height_percent', 0.10)
+            else:
+                # 回退到config文件的配置
+                x_start_percent = OCRConfig.CROP_X_START_PERCENT
+                width_percent = OCRConfig.CROP_WIDTH_PERCENT
+                # 注意：旧配置是从底部计算的，需要转换
+                y_start_percent = 1 - OCRConfig.FOOTER_CROP_HEIGHT_PERCENT - OCRConfig.FOOTER_CROP_Y_START_FROM_BOTTOM_PERCENT
+                height_percent = OCRConfig.FOOTER_CROP_HEIGHT_PERCENT
+            crop_percents = (x_start_percent, y_start_percent, width_percent, height_percent)
 
-            for i in range(total_pages):
-                page = doc.load_page(i)
-                
-                # 渲染当前页为图像
-                mat = fitz.Matrix(dpi/72, dpi/72)
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("png")
-                image = Image.open(io.BytesIO(img_data))
-                
-                width, height = image.size
-
-                # --- 根据传入的crop_data或config计算裁剪区域 ---
-                if crop_data:
-                    x_start_percent = crop_data.get('x_start_percent', 0.40)
-                    width_percent = crop_data.get('width_percent', 0.20)
-                    y_start_percent = crop_data.get('y_start_percent', 0.90)
-                    height_percent = crop_data.get('height_percent', 0.10)
-                else:
-                    # 回退到config文件的配置
-                    x_start_percent = OCRConfig.CROP_X_START_PERCENT
-                    width_percent = OCRConfig.CROP_WIDTH_PERCENT
-                    # 注意：旧配置是从底部计算的，需要转换
-                    y_start_percent = 1 - OCRConfig.FOOTER_CROP_HEIGHT_PERCENT - OCRConfig.FOOTER_CROP_Y_START_FROM_BOTTOM_PERCENT
-                    height_percent = OCRConfig.FOOTER_CROP_HEIGHT_PERCENT
+            # 识别结果取决于页面内容、分辨率和裁剪区域，三者共同组成缓存键
+            crop_signature = f"{dpi}:{x_start_percent:.4f}:{y_start_percent:.4f}:{width_percent:.4f}:{height_percent:.4f}"
 
-                x_start = int(width * x_start_percent)
-                crop_width = int(width * width_percent)
-                y_start = int(height * y_start_percent)
-                crop_height = int(height * height_percent)
+            # 每个文档使用新的后端链，模板只从本文档中学习
+            ocr = create_ocr_chain(self.ocr_backends, semaphore=self.ocr_semaphore,
+                                   min_confidence=OCRConfig.TEMPLATE_MIN_CONFIDENCE)
 
-                left, top = x_start, y_start
-                right, bottom = x_start + crop_width, y_start + crop_height
+            memory = MemoryBudget(self.max_job_memory_bytes)
 
-                regions_to_scan = [(left, top, right, bottom)]
+            page_results: Dict[int, Tuple[Dict, bool]] = {}
+            results_lock = threading.Lock()
+            stopped = threading.Event()
 
-                page_num, cropped_img = self.extract_page_number(image, crop_areas=regions_to_scan, page_index=i)
-                detected_numbers.append(page_num)
-                self.logger.info(f"第 {i + 1}/{total_pages} 页检测到页码: {page_num}")
-
-                # 将裁剪的图片转换为Base64
-                cropped_img_b64 = None
-                if cropped_img:
-                    buffered = io.BytesIO()
-                    cropped_img.save(buffered, format="PNG")
-                    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-                    cropped_img_b64 = f"data:image/png;base64,{img_str}"
-
-                validation_results.append({
-                    'page_index': i,
-                    'actual_number': actual_sequence[i],
-                    'detected_number': page_num,
-                    'is_valid': actual_sequence[i] == page_num,
-                    'cropped_image_b64': cropped_img_b64
-                })
+            def process_pages(doc: fitz.Document, page_indices: range):
+                for i in page_indices:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    if stopped.is_set():
+                        return
+                    if deadline is not None and time.monotonic() >= deadline:
+                        self.logger.warning(f"时间预算 {time_budget} 秒已用完，停止处理第 {i + 1} 页及之后的页面")
+                        stopped.set()
+                        return
+                    page_result = self._validate_page(doc, i, dpi, crop_percents, crop_signature, ocr, memory)
+                    with results_lock:
+                        page_results[i] = page_result
 
-            doc.close()
+            doc = fitz.open(pdf_path)
+            total_pages = len(doc)
+            start, stop = page_range or (0, None)
+            page_indices = range(*slice(start, stop, max(1, stride)).indices(total_pages))
+            try:
+                if self.scheduler is None:
+                    process_pages(doc, page_indices)
+            finally:
+                doc.close()
+
+            if self.scheduler is not None:
+                # 每个批次单独打开文档，避免多个工作线程共享同一个文档对象
+                def make_unit(page_indices: range):
+                    def unit():
+                        batch_doc = fitz.open(pdf_path)
+                        try:
+                            process_pages(batch_doc, page_indices)
+                        finally:
+                            batch_doc.close()
+                    return unit
+
+                batch_size = max(1, self.batch_size)
+                units = [make_unit(page_indices[n:n + batch_size])
+                         for n in range(0, len(page_indices), batch_size)]
+                self.scheduler.run(units, client=client_id, label=os.path.basename(pdf_path))
+
+            stop_reason = 'time_budget' if stopped.is_set() else None
+            validation_results = [page_results[i][0] for i in sorted(page_results)]
+            reused_pages = sum(1 for _, reused in page_results.values() if reused)
 
             # 重新计算统计数据
+            # 部分结果的统计只基于已处理的页面
+            processed_pages = len(validation_results)
             correct_pages_count = sum(1 for r in validation_results if r['is_valid'])
-            issues = [f"第 {r['page_index'] + 1} 页: 期望页码 {r['actual_number']}, 检测到页码 {r['detected_number']}" for r in validation_results if not r['is_valid']]
+            issues = [self.format_issue(r) for r in validation_results if not r['is_valid']]
             
-            success_rate = (correct_pages_count / total_pages) * 100 if total_pages > 0 else 0
+            success_rate = (correct_pages_count / processed_pages) * 100 if processed_pages > 0 else 0
 
             result = {
                 'total_pages': total_pages,
+                'processed_pages': processed_pages,
+                'incomplete': processed_pages < len(page_indices),
+                'stop_reason': stop_reason,
                 'correct_pages': correct_pages_count,
-                'error_pages': total_pages - correct_pages_count,
+                'error_pages': processed_pages - correct_pages_count,
                 'validation_results': validation_results,
                 'issues': issues,
-                'success_rate': success_rate
+                'success_rate': success_rate,
+                'reused_pages': reused_pages,
+                'ocr_backend_usage': dict(ocr.usage),
+                'peak_render_bytes': memory.peak_bytes,
+                'max_page_render_bytes': max((r['render_bytes'] for r in validation_results), default=0)
             }
+            if page_range is not None or stride != 1:
+                result['shard'] = {
+                    'filename': os.path.basename(pdf_path),
+                    'document_sha256': document_sha256(pdf_path),
+                    'start': page_indices.start,
+                    'stop': page_indices.stop,
+                    'stride': page_indices.step,
+                    'planned_pages': len(page_indices),
+                    'dpi': dpi,
+                    'crop_signature': crop_signature,
+                }
             
-            self.logger.info(f"验证完成，成功率: {result['success_rate']:.2f}%")
+            self.logger.info(f"验证完成，成功率: {result['success_rate']:.2f}%，复用 {reused_pages} 页，OCR后端使用: {ocr.usage}")
             return result
             
+        except JobCancelledError as e:
+            self.logger.warning(f"PDF验证已中止: {e}")
+            raise
         except Exception as e:
             self.logger.error(f"PDF验证失败: {e}", exc_info=True)
             raise
     
-    def generate_report(self, validation_result: Dict, output_path: str = None) -> str:
+    @staticmethod
+    def format_issue(page_result: Dict) -> str:
+        """
+        生成单页问题描述
+        
+        Args:
+            page_result: validation_results 中的一页
+            
+        Returns:
+            str: 问题描述
+        """
+        return f"第 {page_result['page_index'] + 1} 页: 期望页码 {page_result['actual_number']}, 检测到页码 {page_result['detected_number']}"
+    
+    @staticmethod
+    def generate_report(validation_result: Dict, output_path: str = None) -> str:
         """
         生成验证报告
         
+        不依赖OCR引擎，合并分片结果时可直接通过类调用。
+        
         Args:
             validation_result: 验证结果字典
             output_path: 输出文件路径，如果为None则返回报告内容
@@ -328,10 +560,22 @@ class PDFPageValidator:
                 "=" * 60,
                 f"总页数: {validation_result['total_pages']}",
                 f"验证成功率: {validation_result['success_rate']:.2f}%",
+            ]
+            
+            if validation_result.get('incomplete'):
+                report_lines.append(
+                    f"⚠ 结果不完整: 仅处理了 {validation_result['processed_pages']}/{validation_result['total_pages']} 页 "
+                    f"(原因: {validation_result.get('stop_reason')})"
+                )
+            
+            if validation_result.get('missing_page_indices'):
+                report_lines.append(f"⚠ 分片未覆盖 {len(validation_result['missing_page_indices'])} 页")
+            
+            report_lines.extend([
                 "",
                 "详细结果:",
                 "-" * 40
-            ]
+            ])
             
             # 添加详细结果
             for result in validation_result['validation_results']:
@@ -339,7 +583,7 @@ class PDFPageValidator:
                 report_lines.append(
                     f"第 {result['page_index'] + 1:2d} 页: "
                     f"期望 {result['actual_number']:2d}, "
-                    f"检测 {result['detected_number'] or 'N/A':2s} {status}"
+                    f"检测 {str(result['detected_number'] or 'N/A'):2s} {status}"
                 )
             
             if validation_result['issues']:
@@ -351,6 +595,15 @@ class PDFPageValidator:
                 for issue in validation_result['issues']:
                     report_lines.append(f"• {issue}")
             
+            if validation_result.get('continuity_issues'):
+                report_lines.extend([
+                    "",
+                    "分片交界检查:",
+                    "-" * 20
+                ])
+                for issue in validation_result['continuity_issues']:
+                    report_lines.append(f"• {issue}")
+            
             report_content = "\n".join(report_lines)
             
             # 如果指定了输出路径，保存到文件
@@ -362,17 +615,35 @@ class PDFPageValidator:
                 csv_path = output_path.replace('.txt', '.csv')
                 df.to_csv(csv_path, index=False, encoding='utf-8-sig')
                 
-                self.logger.info(f"报告已保存到: {output_path}")
-                self.logger.info(f"详细数据已保存到: {csv_path}")
+                logging.getLogger('PDFPageValidator').info(f"报告已保存到: {output_path}")
+                logging.getLogger('PDFPageValidator').info(f"详细数据已保存到: {csv_path}")
                 return output_path
             
             return report_content
             
         except Exception as e:
-            self.logger.error(f"生成报告失败: {e}")
+            logging.getLogger('PDFPageValidator').error(f"生成报告失败: {e}")
             raise
 
 
+def _parse_page_range(text: str) -> Tuple[int, Optional[int]]:
+    """
+    解析命令行中的页码范围
+    
+    Args:
+        text: 形如 "1-500" 或 "501-" 的页码范围，页码从1开始且包含两端
+        
+    Returns:
+        Tuple[int, Optional[int]]: 从0开始、不含结束页的页面索引范围
+    """
+    import argparse
+    
+    match = re.fullmatch(r'\s*(\d+)\s*-\s*(\d*)\s*', text)
+    if not match or int(match.group(1)) < 1 or (match.group(2) and int(match.group(2)) < int(match.group(1))):
+        raise argparse.ArgumentTypeError(f"无效的页码范围: {text}")
+    return int(match.group(1)) - 1, int(match.group(2)) if match.group(2) else None
+
+
 def main():
     """
     主函数 - 命令行接口
@@ -384,15 +655,43 @@ def main():
     parser.add_argument('-o', '--output', help='输出报告文件路径')
     parser.add_argument('--tesseract-path', help='Tesseract安装路径')
     parser.add_argument('--dpi', type=int, default=300, help='图像分辨率')
+    parser.add_argument('--time-budget', type=float, help='时间预算（秒），超时后输出部分结果')
+    parser.add_argument('--workers', type=int, default=0, help='并行处理页面的工作线程数，0表示逐页处理')
+    parser.add_argument('--batch-size', type=int, default=4, help='每个工作单元包含的页数')
+    parser.add_argument('--ocr-backends', help='按优先级排列的OCR后端，以逗号分隔，例如 template,tesseract')
+    parser.add_argument('--page-range', type=_parse_page_range, metavar='START-END',
+                        help='只验证指定页码范围（从1开始，含两端），例如 1-500 或 501-')
+    parser.add_argument('--stride', type=int, default=1, help='页面步长，例如多台机器交错分配页面 (默认: 1)')
+    parser.add_argument('--json-output', help='把验证结果保存为JSON，分片结果可由 sharding.py 合并')
+    parser.add_argument('--profile', metavar='DIR', help='剖析验证过程并把结果保存到指定目录')
+    parser.add_argument('--profile-mode', choices=MODES, default='sampling', help='剖析方式 (默认: sampling)')
     
     args = parser.parse_args()
     
     try:
         # 创建验证器
-        validator = PDFPageValidator(args.tesseract_path)
+        scheduler = PageScheduler(args.workers) if args.workers > 0 else None
+        ocr_backends = [name.strip() for name in args.ocr_backends.split(',') if name.strip()] if args.ocr_backends else None
+        validator = PDFPageValidator(args.tesseract_path, scheduler=scheduler, batch_size=args.batch_size,
+                                     ocr_backends=ocr_backends)
         
         # 执行验证
-        result = validator.validate_page_numbers(args.pdf_path, args.dpi)
+        profiler = None
+        profile_context = nullcontext()
+        if args.profile:
+            profiler = JobProfiler(args.profile, mode=args.profile_mode, max_per_hour=0, threaded=scheduler is not None)
+            profile_context = profiler.profile(os.path.basename(args.pdf_path), requested=True)
+        with profile_context as profile_id:
+            result = validator.validate_page_numbers(args.pdf_path, args.dpi, time_budget=args.time_budget,
+                                                     page_range=args.page_range, stride=args.stride)
+        if profile_id:
+            for fmt in profiler.formats:
+                print(f"剖析结果已保存: {profiler.get_profile_path(profile_id, fmt)}", file=sys.stderr)
+        
+        if args.json_output:
+            with open(args.json_output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            print(f"验证结果已保存到: {args.json_output}", file=sys.stderr)
         
         # 生成报告
         if args.output:
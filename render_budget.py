@@ -0,0 +1,125 @@
+"""
+PDF页码校验工具 - 渲染内存预算
+
+限制页面渲染的内存占用：
+1. 单页像素预算：超大页面（如A0图纸）自动降低实际渲染分辨率
+2. 单任务内存上限：同一任务并行渲染的页面所占内存总和不超过上限
+"""
+
+import math
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import fitz  # PyMuPDF
+
+
+# 渲染时不含透明通道，每个像素占用 RGB 三个字节
+BYTES_PER_PIXEL = 3
+
+
+def estimate_pixels(rect: fitz.Rect, dpi: float) -> int:
+    """
+    估算以指定分辨率渲染一个区域得到的像素数
+
+    Args:
+        rect: 页面坐标系中的区域（单位: 点，1/72英寸）
+        dpi: 渲染分辨率
+
+    Returns:
+        int: 像素数
+    """
+    scale = dpi / 72
+    return int(math.ceil(rect.width * scale) * math.ceil(rect.height * scale))
+
+
+def budgeted_dpi(rect: fitz.Rect, dpi: float, max_pixels: Optional[int]) -> float:
+    """
+    在像素预算内计算实际渲染分辨率
+
+    Args:
+        rect: 要渲染的区域
+        dpi: 期望的分辨率
+        max_pixels: 像素预算，为None或0时不限制
+
+    Returns:
+        float: 不超过期望分辨率、且渲染结果不超过像素预算的分辨率
+    """
+    if not max_pixels:
+        return dpi
+    pixels = estimate_pixels(rect, dpi)
+    if pixels <= max_pixels:
+        return dpi
+    # 像素数与分辨率的平方成正比；略微缩小以抵消取整误差
+    return dpi * math.sqrt(max_pixels / pixels) * 0.99
+
+
+class Reservation:
+    """MemoryBudget.reserve() 返回的预留记录"""
+
+    def __init__(self, budget: 'MemoryBudget', size: int):
+        self.budget = budget
+        self.size = size
+        self.actual: Optional[int] = None
+
+    def resize(self, actual: int):
+        """
+        渲染完成后把预留调整为实际占用的字节数
+
+        Args:
+            actual: 实际占用的字节数，例如像素数据的长度
+        """
+        budget = self.budget
+        with budget._cond:
+            budget._used += actual - self.size
+            budget._actual += actual - (self.actual or 0)
+            budget.peak_bytes = max(budget.peak_bytes, budget._actual)
+            self.size = actual
+            self.actual = actual
+            budget._cond.notify_all()
+
+
+class MemoryBudget:
+    """
+    单个任务的渲染内存预算
+
+    并行渲染时，预留内存超过上限的页面会等待其他页面释放内存；
+    没有其他页面占用内存时总是允许渲染，以免单个大页面永久阻塞。
+    页面先按估算值预留，渲染后调用 Reservation.resize() 改为实际大小；
+    峰值只统计实际大小，与逐页的 render_bytes 口径一致。
+    """
+
+    def __init__(self, limit_bytes: Optional[int] = None):
+        """
+        Args:
+            limit_bytes: 内存上限（字节），为None或0时不限制，只统计峰值
+        """
+        self.limit_bytes = limit_bytes or None
+        self.peak_bytes = 0
+        self._used = 0
+        self._actual = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, size: int) -> Iterator[Reservation]:
+        """
+        在 with 块内预留指定大小的内存
+
+        Args:
+            size: 预留的字节数（估算值）
+
+        Yields:
+            Reservation: 预留记录，渲染后应调用 resize() 登记实际大小
+        """
+        with self._cond:
+            while self.limit_bytes and self._used > 0 and self._used + size > self.limit_bytes:
+                self._cond.wait()
+            self._used += size
+        reservation = Reservation(self, size)
+        try:
+            yield reservation
+        finally:
+            with self._cond:
+                self._used -= reservation.size
+                self._actual -= reservation.actual or 0
+                self._cond.notify_all()
@@ -0,0 +1,212 @@
+"""
+PDF页码校验工具 - 结果编码
+
+为验证结果等大型响应提供紧凑编码和压缩：
+1. json: 紧凑的JSON（不缩进，中文不转义）
+2. columnar: 按列存放的JSON，逐页结果的键名只出现一次
+3. msgpack: 按列存放的MessagePack，图片以二进制而非Base64传输（需要安装 msgpack）
+
+响应体可按 Accept-Encoding 使用 gzip 或 brotli（需要安装 brotli）压缩。
+"""
+
+import base64
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.pdf-validator.columnar+json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+# 格式名称到MIME类型的映射
+FORMATS = {
+    'json': JSON_MIMETYPE,
+    'columnar': COLUMNAR_MIMETYPE,
+    'msgpack': MSGPACK_MIMETYPE,
+}
+
+# 客户端对多种格式给出相同 q 值时的优先顺序
+FORMAT_PREFERENCE = ('msgpack', 'columnar', 'json')
+
+# 以列方式存放的逐行字段
+ROW_FIELDS = ('validation_results', 'tiles')
+
+DATA_URI_PREFIX = 'data:image/png;base64,'
+
+# 小于该大小的响应不压缩
+MIN_COMPRESS_SIZE = 1024
+
+
+def available_formats() -> List[str]:
+    """
+    获取当前环境支持的编码格式
+
+    Returns:
+        List[str]: 格式名称列表
+    """
+    formats = ['json', 'columnar']
+    if msgpack is not None:
+        formats.append('msgpack')
+    return formats
+
+
+def available_encodings() -> List[str]:
+    """
+    获取当前环境支持的压缩算法，按优先级排列
+
+    Returns:
+        List[str]: Content-Encoding 名称列表
+    """
+    return (['br'] if brotli is not None else []) + ['gzip']
+
+
+def to_columnar(payload: Dict) -> Dict:
+    """
+    把逐行字段（如 validation_results）转换为按列存放的结构
+
+    转换后的字段形如 {'layout': 'columns', 'length': N, 'columns': {键: [值, ...]}}。
+
+    Args:
+        payload: 原始响应数据
+
+    Returns:
+        Dict: 转换后的响应数据，原数据不会被修改
+    """
+    result = dict(payload)
+    for field in ROW_FIELDS:
+        rows = payload.get(field)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            continue
+        keys: List[str] = []
+        for row in rows:
+            for key in row:
+                if key not in keys:
+                    keys.append(key)
+        result[field] = {
+            'layout': 'columns',
+            'length': len(rows),
+            'columns': {key: [row.get(key) for row in rows] for key in keys},
+        }
+    return result
+
+
+def _data_uris_to_bytes(value: Any) -> Any:
+    """把PNG数据URI递归替换为二进制数据，供MessagePack使用"""
+    if isinstance(value, str) and value.startswith(DATA_URI_PREFIX):
+        return base64.b64decode(value[len(DATA_URI_PREFIX):])
+    if isinstance(value, dict):
+        return {k: _data_uris_to_bytes(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_data_uris_to_bytes(v) for v in value]
+    return value
+
+
+def encode(payload: Dict, fmt: str) -> bytes:
+    """
+    按指定格式编码响应数据
+
+    Args:
+        payload: 响应数据
+        fmt: 格式名称，见 FORMATS
+
+    Returns:
+        bytes: 编码后的响应体
+
+    Raises:
+        ValueError: 格式无效或当前环境不支持
+    """
+    if fmt == 'json':
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if fmt == 'columnar':
+        return json.dumps(to_columnar(payload), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise ValueError("当前环境未安装 msgpack")
+        return msgpack.packb(_data_uris_to_bytes(to_columnar(payload)), use_bin_type=True)
+    raise ValueError(f"未知的编码格式: {fmt}")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    压缩响应体
+
+    Args:
+        body: 原始响应体
+        encoding: 'gzip' 或 'br'
+
+    Returns:
+        bytes: 压缩后的响应体
+    """
+    if encoding == 'br':
+        if brotli is None:
+            raise ValueError("当前环境未安装 brotli")
+        # 中等压缩级别在压缩率和耗时之间取得平衡
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    raise ValueError(f"未知的压缩算法: {encoding}")
+
+
+def choose_encoding(accepted: List[str]) -> Optional[str]:
+    """
+    从客户端接受的压缩算法中选择一个
+
+    Args:
+        accepted: 客户端 Accept-Encoding 中的算法名称
+
+    Returns:
+        Optional[str]: 选中的算法，客户端不接受任何可用算法时返回None
+    """
+    for encoding in available_encodings():
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def choose_format(accepted: List[Tuple[str, float]]) -> Optional[str]:
+    """
+    按客户端 Accept 中的 q 值选择编码格式
+
+    只认可明确列出的MIME类型；q 值相同时按 FORMAT_PREFERENCE 的顺序选择。
+
+    Args:
+        accepted: 客户端 Accept 中的 (MIME类型, q值) 列表
+
+    Returns:
+        Optional[str]: 选中的格式名称，客户端没有列出任何可用格式时返回None
+    """
+    qualities = {value: quality for value, quality in accepted if quality > 0}
+    candidates = [fmt for fmt in FORMAT_PREFERENCE if fmt in available_formats() and FORMATS[fmt] in qualities]
+    if not candidates:
+        return None
+    # max 在 q 值相同时返回最先出现的候选，即优先级最高的格式
+    return max(candidates, key=lambda fmt: qualities[FORMATS[fmt]])
+
+
+def encode_response(payload: Dict, fmt: str, encoding: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+    """
+    编码并按需压缩响应数据
+
+    Args:
+        payload: 响应数据
+        fmt: 格式名称
+        encoding: 压缩算法，为None时不压缩
+
+    Returns:
+        Tuple[bytes, Optional[str]]: 响应体，以及实际使用的压缩算法（未压缩时为None）
+    """
+    body = encode(payload, fmt)
+    if encoding and len(body) >= MIN_COMPRESS_SIZE:
+        return compress(body, encoding), encoding
+    return body, None
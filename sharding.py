@@ -0,0 +1,183 @@
+"""
+PDF页码校验工具 - 分片验证与合并
+
+把一份大型文档按页面范围和步长拆分给多台机器验证，再合并各分片的部分结果：
+1. 每台机器运行 pdf_page_validator.py --page-range/--stride --json-output，得到自描述的分片结果
+2. 本工具校验各分片属于同一文档、使用相同设置，合并逐页结果并重新计算统计数据
+3. 检查分片覆盖是否完整，并在分片交界处交叉检查检测到的页码是否连续
+
+用法:
+    python sharding.py shards/*.json -o report.txt --json-output merged.json
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from collections import Counter
+from typing import Dict, List
+
+
+def document_sha256(pdf_path: str) -> str:
+    """
+    计算文档文件的SHA-256，用于确认各分片验证的是同一份文档
+
+    Args:
+        pdf_path: PDF文件路径
+
+    Returns:
+        str: 十六进制SHA-256摘要
+    """
+    h = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_shard(path: str) -> Dict:
+    """
+    读取分片结果文件
+
+    Args:
+        path: --json-output 保存的JSON文件路径
+
+    Returns:
+        Dict: 分片结果
+
+    Raises:
+        ValueError: 文件不是分片结果
+    """
+    with open(path, encoding='utf-8') as f:
+        result = json.load(f)
+    if not isinstance(result, dict) or not isinstance(result.get('shard'), dict):
+        raise ValueError(f"不是分片结果（缺少 shard 字段）: {path}")
+    return result
+
+
+def merge_shard_results(shards: List[Dict]) -> Dict:
+    """
+    合并同一文档的多个分片结果
+
+    Args:
+        shards: validate_page_numbers 指定 page_range/stride 时返回的分片结果
+
+    Returns:
+        Dict: 与 validate_page_numbers 结构一致的完整结果，另含 shards、missing_page_indices、
+              boundary_checks 和 continuity_issues 字段
+
+    Raises:
+        ValueError: 没有分片、分片属于不同文档或使用了不同的识别设置
+    """
+    # 避免循环导入：验证器模块依赖本模块计算文档哈希
+    from pdf_page_validator import PDFPageValidator
+
+    if not shards:
+        raise ValueError("没有可合并的分片")
+
+    first = shards[0]['shard']
+    for result in shards[1:]:
+        shard = result['shard']
+        if shard['document_sha256'] != first['document_sha256'] or result['total_pages'] != shards[0]['total_pages']:
+            raise ValueError(f"分片不属于同一文档: {first['filename']} / {shard['filename']}")
+        if (shard['dpi'], shard['crop_signature']) != (first['dpi'], first['crop_signature']):
+            raise ValueError(f"分片的分辨率或裁剪区域不一致: {first['crop_signature']} / {shard['crop_signature']}")
+
+    total_pages = shards[0]['total_pages']
+    pages: Dict[int, Dict] = {}
+    shard_of: Dict[int, int] = {}
+    continuity_issues: List[str] = []
+    for n, result in enumerate(shards):
+        for page in result['validation_results']:
+            i = page['page_index']
+            if i in pages:
+                # 分片范围重叠时保留先出现的结果，结果不一致时提示
+                if page['detected_number'] != pages[i]['detected_number']:
+                    continuity_issues.append(
+                        f"第 {i + 1} 页在分片 {shard_of[i] + 1} 和分片 {n + 1} 中的检测结果不一致: "
+                        f"{pages[i]['detected_number']} / {page['detected_number']}"
+                    )
+                continue
+            pages[i] = page
+            shard_of[i] = n
+
+    validation_results = [pages[i] for i in sorted(pages)]
+    missing = [i for i in range(total_pages) if i not in pages]
+
+    # 在相邻的已处理页面来自不同分片时，检测到的页码之差应等于页面索引之差
+    checked = discontinuous = unverified = 0
+    for a, b in zip(validation_results, validation_results[1:]):
+        i, j = a['page_index'], b['page_index']
+        if shard_of[i] == shard_of[j]:
+            continue
+        checked += 1
+        if a['detected_number'] is None or b['detected_number'] is None:
+            unverified += 1
+        elif b['detected_number'] - a['detected_number'] != j - i:
+            discontinuous += 1
+            continuity_issues.append(
+                f"第 {i + 1} 页与第 {j + 1} 页（分片 {shard_of[i] + 1} / {shard_of[j] + 1} 交界）: "
+                f"检测到页码 {a['detected_number']} → {b['detected_number']}，页码不连续"
+            )
+
+    processed_pages = len(validation_results)
+    correct_pages = sum(1 for r in validation_results if r['is_valid'])
+    issues = [PDFPageValidator.format_issue(r) for r in validation_results if not r['is_valid']]
+    stop_reason = next((r['stop_reason'] for r in shards if r.get('stop_reason')), None)
+    if missing and stop_reason is None:
+        stop_reason = 'missing_pages'
+
+    return {
+        'total_pages': total_pages,
+        'processed_pages': processed_pages,
+        'incomplete': bool(missing),
+        'stop_reason': stop_reason,
+        'correct_pages': correct_pages,
+        'error_pages': processed_pages - correct_pages,
+        'validation_results': validation_results,
+        'issues': issues,
+        'success_rate': correct_pages / processed_pages * 100 if processed_pages > 0 else 0,
+        'reused_pages': sum(r.get('reused_pages', 0) for r in shards),
+        'ocr_backend_usage': dict(sum((Counter(r.get('ocr_backend_usage', {})) for r in shards), Counter())),
+        # 各分片在不同机器上运行，峰值取最大值而非总和
+        'peak_render_bytes': max(r.get('peak_render_bytes', 0) for r in shards),
+        'max_page_render_bytes': max((r['render_bytes'] for r in validation_results), default=0),
+        'shards': [dict(r['shard'], processed_pages=r['processed_pages'], incomplete=r['incomplete']) for r in shards],
+        'missing_page_indices': missing,
+        'boundary_checks': {'checked': checked, 'discontinuous': discontinuous, 'unverified': unverified},
+        'continuity_issues': continuity_issues,
+    }
+
+
+def main():
+    """
+    主函数 - 命令行接口
+    """
+    parser = argparse.ArgumentParser(description='合并分片验证结果')
+    parser.add_argument('shards', nargs='+', help='各分片的JSON结果文件')
+    parser.add_argument('-o', '--output', help='输出报告文件路径')
+    parser.add_argument('--json-output', help='把合并后的结果保存为JSON')
+    args = parser.parse_args()
+
+    from pdf_page_validator import PDFPageValidator
+
+    try:
+        merged = merge_shard_results([load_shard(path) for path in args.shards])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, ensure_ascii=False)
+        print(f"合并结果已保存到: {args.json_output}", file=sys.stderr)
+
+    if args.output:
+        report_path = PDFPageValidator.generate_report(merged, args.output)
+        print(f"合并完成，报告已保存到: {report_path}")
+    else:
+        print(PDFPageValidator.generate_report(merged))
+
+
+if __name__ == "__main__":
+    main()
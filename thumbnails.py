@@ -0,0 +1,237 @@
+"""
+PDF页码校验工具 - 缩略图服务
+
+为整份文档生成低分辨率缩略图，用于在选择裁剪区域时浏览文档布局：
+1. 上传的文档按内容哈希保存在服务器端缓存目录中，后续请求无需重新上传
+2. 缺失的缩略图按页分组，交给多个工作进程并行渲染
+3. 每次请求返回一段页面范围的拼图（sprite sheet）及各缩略图的位置
+"""
+
+import base64
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+
+_DOC_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _render_thumbnails(pdf_path: str, page_indices: List[int], dpi: int) -> List[Tuple[int, bytes]]:
+    """
+    渲染一组页面的缩略图，在工作进程中执行
+
+    Args:
+        pdf_path: PDF文件路径
+        page_indices: 页面索引列表
+        dpi: 缩略图分辨率
+
+    Returns:
+        List[Tuple[int, bytes]]: 页面索引及其PNG数据
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        return [(i, doc.load_page(i).get_pixmap(matrix=mat).tobytes("png")) for i in page_indices]
+    finally:
+        doc.close()
+
+
+class ThumbnailService:
+    """
+    缩略图渲染与缓存服务
+
+    缓存目录结构: <cache_dir>/<文档SHA-256>/source.pdf 及 thumb_<dpi>_<页面索引>.png
+    """
+
+    def __init__(self, cache_dir: str, workers: int = 2, dpi: int = 20, max_documents: int = 20):
+        """
+        Args:
+            cache_dir: 缓存目录
+            workers: 渲染工作进程数，0表示在当前进程中渲染
+            dpi: 缩略图分辨率
+            max_documents: 最多缓存的文档数，超出时删除最久未访问的文档
+        """
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.workers = max(0, workers)
+        self.dpi = dpi
+        self.max_documents = max(1, max_documents)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _doc_dir(self, doc_hash: str) -> str:
+        if not _DOC_HASH_PATTERN.match(doc_hash):
+            raise ValueError(f"无效的文档哈希: {doc_hash}")
+        return os.path.join(self.cache_dir, doc_hash)
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers == 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # 服务进程中已有多个线程，fork 出的子进程可能继承被其他线程持有的锁而死锁，改用 spawn
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def register(self, stream: BinaryIO) -> str:
+        """
+        把上传的文档保存到缓存中
+
+        Args:
+            stream: 文档内容的二进制流
+
+        Returns:
+            str: 文档的SHA-256哈希，用于后续请求
+
+        Raises:
+            ValueError: 内容不是可以打开的PDF文档
+        """
+        h = hashlib.sha256()
+        tmp_path = os.path.join(self.cache_dir, f".upload_{threading.get_ident()}_{os.getpid()}.pdf")
+        with open(tmp_path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+                h.update(chunk)
+                f.write(chunk)
+
+        doc_hash = h.hexdigest()
+        doc_dir = self._doc_dir(doc_hash)
+        source_path = os.path.join(doc_dir, 'source.pdf')
+        if os.path.exists(source_path):
+            os.remove(tmp_path)
+            self.logger.info(f"文档已在缩略图缓存中: {doc_hash[:12]}")
+        else:
+            # 先确认是可以打开的PDF，避免无效文件占用缓存名额
+            try:
+                with fitz.open(tmp_path, filetype='pdf') as doc:
+                    if doc.page_count == 0:
+                        raise ValueError("文档没有页面")
+            except Exception as e:
+                os.remove(tmp_path)
+                raise ValueError(f"无效的PDF文档: {e}") from e
+            os.makedirs(doc_dir, exist_ok=True)
+            os.replace(tmp_path, source_path)
+            self.logger.info(f"文档已加入缩略图缓存: {doc_hash[:12]}")
+            self._evict()
+        return doc_hash
+
+    def has_document(self, doc_hash: str) -> bool:
+        """判断文档是否在缓存中"""
+        try:
+            return os.path.exists(os.path.join(self._doc_dir(doc_hash), 'source.pdf'))
+        except ValueError:
+            return False
+
+    def _evict(self):
+        """删除最久未访问的文档，使缓存的文档数不超过上限"""
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                   if _DOC_HASH_PATTERN.match(name)]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for path in entries[self.max_documents:]:
+            shutil.rmtree(path, ignore_errors=True)
+            self.logger.info(f"缩略图缓存已淘汰文档: {os.path.basename(path)[:12]}")
+
+    def _ensure_thumbnails(self, doc_dir: str, page_indices: List[int]) -> Dict[int, str]:
+        """
+        确保指定页面的缩略图已渲染，缺失的页面并行渲染
+
+        Returns:
+            Dict[int, str]: 页面索引到缩略图文件路径的映射
+        """
+        paths = {i: os.path.join(doc_dir, f"thumb_{self.dpi}_{i}.png") for i in page_indices}
+        missing = [i for i, path in paths.items() if not os.path.exists(path)]
+        if not missing:
+            return paths
+
+        source_path = os.path.join(doc_dir, 'source.pdf')
+        executor = self._get_executor()
+        if executor is None:
+            rendered = _render_thumbnails(source_path, missing, self.dpi)
+        else:
+            # 把缺失的页面均匀分配给各个工作进程
+            chunk_count = min(self.workers, len(missing))
+            chunks = [missing[n::chunk_count] for n in range(chunk_count)]
+            futures = [executor.submit(_render_thumbnails, source_path, chunk, self.dpi) for chunk in chunks]
+            rendered = [item for future in futures for item in future.result()]
+
+        for i, png in rendered:
+            # 先写临时文件再替换，避免并发请求读到不完整的图片
+            tmp_path = f"{paths[i]}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(png)
+            os.replace(tmp_path, paths[i])
+
+        self.logger.info(f"已渲染 {len(missing)} 张缩略图，缓存命中 {len(page_indices) - len(missing)} 张")
+        return paths
+
+    def get_sheet(self, doc_hash: str, start: int = 0, count: int = 50, columns: int = 10) -> Dict:
+        """
+        获取一段页面范围的缩略图拼图
+
+        Args:
+            doc_hash: 文档哈希
+            start: 起始页面索引（从0开始）
+            count: 页数
+            columns: 拼图每行的缩略图数
+
+        Returns:
+            Dict: 包含总页数、拼图（Base64 PNG）及各缩略图位置的字典
+
+        Raises:
+            FileNotFoundError: 文档不在缓存中
+        """
+        doc_dir = self._doc_dir(doc_hash)
+        source_path = os.path.join(doc_dir, 'source.pdf')
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f"文档不在缩略图缓存中: {doc_hash}")
+        os.utime(doc_dir)
+
+        doc = fitz.open(source_path)
+        total_pages = len(doc)
+        doc.close()
+
+        start = max(0, min(start, total_pages))
+        end = min(total_pages, start + max(1, count))
+        page_indices = list(range(start, end))
+        paths = self._ensure_thumbnails(doc_dir, page_indices)
+
+        images = [(i, Image.open(paths[i])) for i in page_indices]
+        tiles = []
+        sheet_b64 = None
+        if images:
+            tile_w = max(img.width for _, img in images)
+            tile_h = max(img.height for _, img in images)
+            columns = max(1, min(columns, len(images)))
+            rows = (len(images) + columns - 1) // columns
+            sheet = Image.new('RGB', (tile_w * columns, tile_h * rows), 'white')
+            for n, (i, img) in enumerate(images):
+                x, y = (n % columns) * tile_w, (n // columns) * tile_h
+                sheet.paste(img, (x, y))
+                tiles.append({'page_index': i, 'x': x, 'y': y, 'width': img.width, 'height': img.height})
+                img.close()
+
+            buffered = io.BytesIO()
+            sheet.save(buffered, format="PNG", optimize=True)
+            sheet_b64 = f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode('utf-8')}"
+
+        return {
+            'document_hash': doc_hash,
+            'total_pages': total_pages,
+            'start': start,
+            'count': len(tiles),
+            'next_start': end if end < total_pages else None,
+            'dpi': self.dpi,
+            'sheet': sheet_b64,
+            'tiles': tiles,
+        }
@@ -0,0 +1,214 @@
+"""
+PDF页码校验工具 - 验证器池
+
+为Web应用提供线程安全的验证器实例池，包括：
+1. 限制同时处理的文档数量；单页预览另有独立的并发上限，不占用文档名额
+2. 限制同时运行的Tesseract子进程数量
+3. 有界等待队列，超出时快速拒绝并给出 Retry-After 建议
+4. 统计队列长度和等待时间
+"""
+
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+from pdf_page_validator import PDFPageValidator
+
+
+class PoolBusyError(Exception):
+    """
+    验证器池繁忙时抛出的异常
+
+    Attributes:
+        code: 错误代码，'QUEUE_FULL' 表示等待队列已满，'QUEUE_TIMEOUT' 表示等待超时
+        retry_after: 建议客户端重试前等待的秒数
+    """
+
+    def __init__(self, message: str, code: str, retry_after: int):
+        super().__init__(message)
+        self.code = code
+        self.retry_after = retry_after
+
+
+class ValidatorPool:
+    """
+    验证器实例池
+
+    每个正在处理的文档独占一个验证器实例；所有实例共享同一个OCR信号量，
+    以限制整个进程内并发的Tesseract子进程数。
+    单页预览只渲染一页且受像素预算限制，使用独立的并发上限，不会排在文档验证之后。
+    """
+
+    def __init__(self, factory: Callable[..., PDFPageValidator], max_concurrent_jobs: int,
+                 max_concurrent_ocr: int, max_queue_depth: int, max_wait_seconds: float,
+                 max_concurrent_previews: int = 4):
+        """
+        初始化验证器池
+
+        Args:
+            factory: 创建验证器的可调用对象，接收关键字参数 ocr_semaphore
+            max_concurrent_jobs: 同时处理的文档数上限
+            max_concurrent_ocr: 同时运行的OCR子进程数上限
+            max_queue_depth: 等待队列的最大长度
+            max_wait_seconds: 请求在队列中的最长等待时间（秒）
+            max_concurrent_previews: 同时生成的单页预览数上限
+        """
+        self.logger = logging.getLogger(__name__)
+        self._factory = factory
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.max_concurrent_ocr = max(1, max_concurrent_ocr)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self.max_wait_seconds = max_wait_seconds
+        self.max_concurrent_previews = max(1, max_concurrent_previews)
+
+        self._ocr_semaphore = threading.BoundedSemaphore(self.max_concurrent_ocr)
+        self._cond = threading.Condition()
+        self._idle: List[PDFPageValidator] = []
+        self._active = 0
+        self._waiting = 0
+        self._active_previews = 0
+        self._waiting_previews = 0
+
+        # 统计数据
+        self._admitted = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._avg_job_seconds = 0.0
+
+    def _estimate_retry_after(self) -> int:
+        """
+        根据平均处理时长和当前排队情况估算建议的重试等待时间
+
+        Returns:
+            int: 建议等待的秒数，至少为1
+        """
+        rounds = (self._waiting + 1) / self.max_concurrent_jobs
+        return max(1, int(round(self._avg_job_seconds * rounds)))
+
+    def _reject(self, message: str, code: str) -> PoolBusyError:
+        self._rejected += 1
+        retry_after = self._estimate_retry_after()
+        self.logger.warning(f"{message} (活动: {self._active}, 排队: {self._waiting}, 建议 {retry_after} 秒后重试)")
+        return PoolBusyError(message, code, retry_after)
+
+    @contextmanager
+    def acquire(self) -> Iterator[PDFPageValidator]:
+        """
+        获取一个验证器实例，在 with 块结束时自动归还
+
+        Yields:
+            PDFPageValidator: 当前请求独占的验证器实例
+
+        Raises:
+            PoolBusyError: 等待队列已满或等待超时
+        """
+        start = time.monotonic()
+        with self._cond:
+            if self._active >= self.max_concurrent_jobs and self._waiting >= self.max_queue_depth:
+                raise self._reject("等待队列已满", 'QUEUE_FULL')
+
+            self._waiting += 1
+            try:
+                deadline = start + self.max_wait_seconds
+                while self._active >= self.max_concurrent_jobs:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject("排队等待超时", 'QUEUE_TIMEOUT')
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            self._active += 1
+            self._admitted += 1
+            waited = time.monotonic() - start
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            validator = self._idle.pop() if self._idle else None
+
+        job_start = time.monotonic()
+        try:
+            # 在锁外创建实例，避免Tesseract版本检查阻塞其他线程
+            if validator is None:
+                validator = self._factory(ocr_semaphore=self._ocr_semaphore)
+            yield validator
+        finally:
+            elapsed = time.monotonic() - job_start
+            with self._cond:
+                self._active -= 1
+                if validator is not None:
+                    self._idle.append(validator)
+                # 指数移动平均，用于估算 Retry-After
+                if self._avg_job_seconds == 0:
+                    self._avg_job_seconds = elapsed
+                else:
+                    self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+                self._cond.notify_all()
+
+    @contextmanager
+    def acquire_preview(self) -> Iterator[PDFPageValidator]:
+        """
+        获取一个用于单页预览的验证器实例，只受预览并发上限约束
+
+        Yields:
+            PDFPageValidator: 当前请求独占的验证器实例
+
+        Raises:
+            PoolBusyError: 等待队列已满或等待超时
+        """
+        start = time.monotonic()
+        with self._cond:
+            if self._active_previews >= self.max_concurrent_previews and self._waiting_previews >= self.max_queue_depth:
+                raise self._reject("预览等待队列已满", 'QUEUE_FULL')
+
+            self._waiting_previews += 1
+            try:
+                deadline = start + self.max_wait_seconds
+                while self._active_previews >= self.max_concurrent_previews:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject("预览排队等待超时", 'QUEUE_TIMEOUT')
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting_previews -= 1
+
+            self._active_previews += 1
+            validator = self._idle.pop() if self._idle else None
+
+        try:
+            if validator is None:
+                validator = self._factory(ocr_semaphore=self._ocr_semaphore)
+            yield validator
+        finally:
+            with self._cond:
+                self._active_previews -= 1
+                if validator is not None:
+                    self._idle.append(validator)
+                self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """
+        获取验证器池的运行状态
+
+        Returns:
+            Dict: 包含活动任务数、排队长度、等待时间等统计信息
+        """
+        with self._cond:
+            return {
+                'active_jobs': self._active,
+                'queued_jobs': self._waiting,
+                'active_previews': self._active_previews,
+                'queued_previews': self._waiting_previews,
+                'max_concurrent_previews': self.max_concurrent_previews,
+                'idle_validators': len(self._idle),
+                'max_concurrent_jobs': self.max_concurrent_jobs,
+                'max_concurrent_ocr': self.max_concurrent_ocr,
+                'max_queue_depth': self.max_queue_depth,
+                'admitted_total': self._admitted,
+                'rejected_total': self._rejected,
+                'avg_wait_seconds': self._total_wait / self._admitted if self._admitted else 0.0,
+                'max_wait_seconds': self._max_wait,
+                'avg_job_seconds': self._avg_job_seconds,
+            }